@@ -0,0 +1,89 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from utils.ConfigManager import config
+
+# database name -> engine
+ENGINES = dict()
+# database name -> pool counters, see DatabaseEngine.get_pool_stats.
+POOL_STATS = dict()
+POOL_STATS_LOCK = threading.Lock()
+
+
+class MonitoredQueuePool(QueuePool):
+    # QueuePool that counts the checkouts which had to wait for a connection to be returned, and the ones that gave up.
+
+    stats_name = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats_name = self.stats_name
+        return pool
+
+    def _do_get(self):
+        if self._max_overflow < 0 or self.checkedout() < self.size() + self._max_overflow:
+            return super()._do_get()
+
+        start = time.monotonic()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            DatabaseEngine.count(self.stats_name, 'timeouts')
+            raise
+        finally:
+            DatabaseEngine.count(self.stats_name, 'waits')
+            DatabaseEngine.count(self.stats_name, 'wait_seconds', time.monotonic() - start)
+
+
+class DatabaseEngine(object):
+    # Every database engine is created here, so they all share the pool settings from config.Database.Pool.
+
+    @staticmethod
+    def create_engine(db_name):
+        engine = create_engine('mysql+pymysql://%s:%s@%s/%s?charset=utf8mb4' % (config.Database.Connection.username,
+                                                                                config.Database.Connection.password,
+                                                                                config.Database.Connection.host,
+                                                                                db_name),
+                               poolclass=MonitoredQueuePool,
+                               pool_size=config.Database.Pool.size,
+                               max_overflow=config.Database.Pool.max_overflow,
+                               pool_timeout=config.Database.Pool.timeout,
+                               pool_recycle=config.Database.Pool.recycle,
+                               pool_pre_ping=config.Database.Pool.pre_ping)
+
+        with POOL_STATS_LOCK:
+            POOL_STATS[db_name] = {'connects': 0, 'checkouts': 0, 'invalidations': 0, 'waits': 0, 'wait_seconds': 0,
+                                   'timeouts': 0, 'peak_checked_out': 0}
+            ENGINES[db_name] = engine
+        engine.pool.stats_name = db_name
+        event.listen(engine, 'connect', lambda *args: DatabaseEngine.count(db_name, 'connects'))
+        event.listen(engine, 'invalidate', lambda *args: DatabaseEngine.count(db_name, 'invalidations'))
+        event.listen(engine, 'checkout', lambda *args: DatabaseEngine.on_checkout(engine, db_name))
+        return engine
+
+    @staticmethod
+    def count(db_name, counter, value=1):
+        with POOL_STATS_LOCK:
+            POOL_STATS[db_name][counter] += value
+
+    @staticmethod
+    def on_checkout(engine, db_name):
+        checked_out = engine.pool.checkedout()
+        with POOL_STATS_LOCK:
+            stats = POOL_STATS[db_name]
+            stats['checkouts'] += 1
+            stats['peak_checked_out'] = max(stats['peak_checked_out'], checked_out)
+
+    # {database name: counters}, along with how many connections are in use right now.
+    @staticmethod
+    def get_pool_stats():
+        with POOL_STATS_LOCK:
+            pool_stats = {db_name: dict(stats) for db_name, stats in POOL_STATS.items()}
+        for db_name, engine in ENGINES.items():
+            pool_stats[db_name]['checked_out'] = engine.pool.checkedout()
+            pool_stats[db_name]['overflow'] = max(0, engine.pool.overflow())
+        return pool_stats
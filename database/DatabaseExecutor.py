@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import SimpleQueue, Empty
+
+from utils.ConfigManager import config
+from utils.Logger import Logger
+
+EXECUTOR = ThreadPoolExecutor(max_workers=config.Server.Settings.database_workers,
+                              thread_name_prefix='DatabaseWorker')
+# (session, callback, future) of finished queries, waiting to be handed back on the world tick.
+COMPLETED_QUERIES = SimpleQueue()
+# query name -> [count, total seconds, max seconds]
+QUERY_STATS = dict()
+QUERY_STATS_LOCK = threading.Lock()
+
+
+class DatabaseExecutor(object):
+    # Runs database calls on a bounded pool of worker threads, so packet handling never waits on them. Every call
+    # returns a future, and its callback (if any) runs on the world tick with the result, only if the session that
+    # asked for it is still connected. That keeps game state changes on the same thread as every other update.
+    # Callbacks must never block the tick, they disconnect sessions with session.request_disconnect().
+
+    @staticmethod
+    def submit(session, query, *args, callback=None):
+        future = EXECUTOR.submit(DatabaseExecutor._run, query, *args)
+        if callback:
+            future.add_done_callback(lambda done: COMPLETED_QUERIES.put((session, callback, done)))
+        return future
+
+    # Called every world tick.
+    @staticmethod
+    def dispatch_callbacks():
+        while True:
+            try:
+                session, callback, future = COMPLETED_QUERIES.get_nowait()
+            except Empty:
+                return
+
+            if not session.is_alive or not session.keep_alive:
+                continue
+
+            if future.exception():
+                Logger.error('[%s] Database query failed: %s' % (session.client_address[0], future.exception()))
+                session.request_disconnect()
+                continue
+
+            try:
+                callback(future.result())
+            except Exception as e:
+                Logger.error('[%s] Error handling database result: %s' % (session.client_address[0], e))
+
+    @staticmethod
+    def _run(query, *args):
+        start = time.monotonic()
+        try:
+            return query(*args)
+        finally:
+            DatabaseExecutor._record(query.__qualname__, time.monotonic() - start)
+
+    @staticmethod
+    def _record(name, duration):
+        with QUERY_STATS_LOCK:
+            stats = QUERY_STATS.get(name)
+            if stats:
+                stats[0] += 1
+                stats[1] += duration
+                stats[2] = max(stats[2], duration)
+            else:
+                QUERY_STATS[name] = [1, duration, duration]
+
+        if duration * 1000 > config.Server.Settings.slow_query_threshold_ms:
+            Logger.warning('Slow database query %s took %.2f ms.' % (name, duration * 1000))
+
+    # [(name, count, average ms, max ms)], slowest on average first.
+    @staticmethod
+    def get_stats():
+        with QUERY_STATS_LOCK:
+            stats = [(name, count, total / count * 1000, max_ * 1000)
+                     for name, (count, total, max_) in QUERY_STATS.items()]
+        return sorted(stats, key=lambda stat: stat[2], reverse=True)
@@ -1,78 +1,102 @@
-from sqlalchemy import create_engine, func
+import threading
+
+from sqlalchemy import func
 from sqlalchemy.exc import StatementError
 from sqlalchemy.orm import sessionmaker, scoped_session
 
+from database.DatabaseEngine import DatabaseEngine
 from database.dbc.DbcModels import *
+from database.snapshot.SnapshotManager import SnapshotManager
 from utils.ConfigManager import *
+from utils.Logger import Logger
 
-dbc_db_engine = create_engine('mysql+pymysql://%s:%s@%s/%s?charset=utf8mb4' % (config.Database.Connection.username,
-                                                                               config.Database.Connection.password,
-                                                                               config.Database.Connection.host,
-                                                                               config.Database.DBNames.dbc_db),
-                              pool_pre_ping=True)
+dbc_db_engine = DatabaseEngine.create_engine(config.Database.DBNames.dbc_db)
 SessionHolder = scoped_session(sessionmaker(bind=dbc_db_engine, autocommit=True, autoflush=True))
 
+# DBC data never changes, every table is read once and kept as namedtuple rows indexed by ID. Tables are loaded at
+# world server startup, or the first time they are used.
+DBC_TABLES = dict()
+DBC_TABLES_LOCK = threading.Lock()
+# (RaceID, ClassID, GenderID) -> CharStartOutfit
+CHAR_START_OUTFITS = dict()
+
 
 class DbcDatabaseManager(object):
+    # Store
+
+    @staticmethod
+    def load_tables():
+        rows = 0
+        for model in Base.__subclasses__():
+            rows += len(DbcDatabaseManager.get_table(model))
+        Logger.info('Loaded %u DBC tables (%u rows).' % (len(DBC_TABLES), rows))
+
+    @staticmethod
+    def get_table(model):
+        table = DBC_TABLES.get(model)
+        if table is None:
+            with DBC_TABLES_LOCK:
+                table = DBC_TABLES.get(model)
+                if table is None:
+                    table = DbcDatabaseManager._load_table(model)
+                    if model == CharStartOutfit:
+                        DbcDatabaseManager._index_char_start_outfits(table)
+                    DBC_TABLES[model] = table
+        return table
+
+    @staticmethod
+    def _load_table(model):
+        rows = SnapshotManager.get_rows(model)
+        if rows is None:
+            rows = SnapshotManager.query_rows(SessionHolder, model)
+        return SnapshotManager.index_rows(model, rows)
+
+    @staticmethod
+    def _index_char_start_outfits(table):
+        CHAR_START_OUTFITS.clear()
+        for outfit_id in sorted(table):
+            outfit = table[outfit_id]
+            CHAR_START_OUTFITS.setdefault((outfit.RaceID, outfit.ClassID, outfit.GenderID), outfit)
+
     # ChrRaces
 
     @staticmethod
     def chr_races_get_by_race(race):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(ChrRaces).filter_by(ID=race).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(ChrRaces).get(race)
 
     # AreaTrigger
 
     @staticmethod
     def area_trigger_get_by_id(trigger_id):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(AreaTrigger).filter_by(ID=trigger_id).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(AreaTrigger).get(trigger_id)
 
     # EmoteText
 
     @staticmethod
     def emote_text_get_by_id(emote_id):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(EmotesText).filter_by(ID=emote_id).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(EmotesText).get(emote_id)
 
     # Spell
 
     @staticmethod
     def spell_get_by_id(spell_id):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(Spell).filter_by(ID=spell_id).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(Spell).get(spell_id)
 
     # Skill
 
     @staticmethod
     def skill_get_by_id(skill_id):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(SkillLine).filter_by(ID=skill_id).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(SkillLine).get(skill_id)
 
     # CharStartOutfit
 
     @staticmethod
     def char_start_outfit_get(race, class_, gender):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(CharStartOutfit).filter_by(RaceID=race, ClassID=class_, GenderID=gender).first()
-        dbc_db_session.close()
-        return res
+        DbcDatabaseManager.get_table(CharStartOutfit)
+        return CHAR_START_OUTFITS.get((race, class_, gender))
 
     # CreatureDisplayInfo
 
     @staticmethod
     def creature_display_info_get_by_model_id(model_id):
-        dbc_db_session = SessionHolder()
-        res = dbc_db_session.query(CreatureDisplayInfo).filter_by(ID=model_id).first()
-        dbc_db_session.close()
-        return res
+        return DbcDatabaseManager.get_table(CreatureDisplayInfo).get(model_id)
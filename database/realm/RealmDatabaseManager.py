@@ -1,17 +1,15 @@
-from sqlalchemy import create_engine, func
+from sqlalchemy import func
 from sqlalchemy.exc import StatementError
 from sqlalchemy.orm import sessionmaker, scoped_session
 
+from database.DatabaseEngine import DatabaseEngine
 from database.realm.RealmModels import *
 from utils.ConfigManager import *
+from utils.constants.ItemCodes import InventorySlots
 from game.realm.AccountManager import AccountManager
 
 
-realm_db_engine = create_engine('mysql+pymysql://%s:%s@%s/%s?charset=utf8mb4' % (config.Database.Connection.username,
-                                                                                 config.Database.Connection.password,
-                                                                                 config.Database.Connection.host,
-                                                                                 config.Database.DBNames.realm_db),
-                                pool_pre_ping=True)
+realm_db_engine = DatabaseEngine.create_engine(config.Database.DBNames.realm_db)
 SessionHolder = scoped_session(sessionmaker(bind=realm_db_engine, autocommit=True, autoflush=True))
 
 
@@ -45,6 +43,24 @@ class RealmDatabaseManager(object):
         realm_db_session.close()
         return characters if characters else []
 
+    # Equipped items (paperdoll slots) of every character in the account, in a single query.
+    # Returns {character guid: {slot: item entry}}.
+    @staticmethod
+    def account_get_equipment(account_id):
+        realm_db_session = SessionHolder()
+        items = realm_db_session.query(CharacterInventory.owner, CharacterInventory.slot,
+                                       CharacterInventory.item_template) \
+            .join(Character, Character.guid == CharacterInventory.owner) \
+            .filter(Character.account_id == account_id,
+                    CharacterInventory.bag == InventorySlots.SLOT_INBACKPACK,
+                    CharacterInventory.slot < InventorySlots.SLOT_BAG1).all()
+        realm_db_session.close()
+
+        equipment = dict()
+        for owner, slot, item_template in items:
+            equipment.setdefault(owner, dict())[slot] = item_template
+        return equipment
+
     # Character stuff
 
     @staticmethod
@@ -84,6 +100,15 @@ class RealmDatabaseManager(object):
         realm_db_session.flush()
         realm_db_session.close()
 
+    # Partial updates of many characters in a single transaction, each mapping holds the guid and the changed columns.
+    # Rows changing the same set of columns are sent together as one executemany.
+    @staticmethod
+    def character_bulk_update(mappings):
+        realm_db_session = SessionHolder()
+        with realm_db_session.begin():
+            realm_db_session.bulk_update_mappings(Character, mappings)
+        realm_db_session.close()
+
     @staticmethod
     def character_inventory_get(character_guid):
         realm_db_session = SessionHolder()
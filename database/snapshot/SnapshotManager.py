@@ -0,0 +1,168 @@
+import marshal
+import mmap
+import os
+import sys
+from collections import namedtuple
+from decimal import Decimal
+from struct import pack, unpack_from, calcsize, error as StructError
+
+from sqlalchemy import inspect, select
+
+from utils.ConfigManager import config
+from utils.Logger import Logger
+
+# Snapshot file layout:
+#   Header: magic (4 bytes) + format version (uint32) + Python major and minor version (uint8 each) + marshal version
+#   (uint8) + table directory size (uint32). Marshal data is only guaranteed to load on the version that wrote it.
+#   Table directory: marshalled {table name: (schema, offset, size)}
+#   Tables: one marshalled list of row tuples per table, offsets are relative to the end of the directory.
+# Tables are only decoded when requested, and only if the model schema didn't change since the snapshot was built.
+SNAPSHOT_MAGIC = b'ACSS'
+SNAPSHOT_FORMAT_VERSION = 2
+HEADER_FORMAT = '<4sI3BI'
+HEADER_SIZE = calcsize(HEADER_FORMAT)
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), '../..', config.Server.Settings.static_data_snapshot)
+
+
+class Snapshot(object):
+    def __init__(self, snapshot_file, data, directory, tables_offset):
+        self.snapshot_file = snapshot_file
+        self.data = data
+        self.directory = directory
+        self.tables_offset = tables_offset
+
+
+SNAPSHOT = None
+# model -> namedtuple type its rows are returned as.
+ROW_TYPES = dict()
+
+
+class SnapshotManager(object):
+
+    @staticmethod
+    def get_table_name(model):
+        return '%s.%s' % (model.__module__, model.__tablename__)
+
+    @staticmethod
+    def get_schema(model):
+        return tuple((column_attr.key, str(column_attr.columns[0].type)) for column_attr in inspect(model).column_attrs)
+
+    # Rows as plain tuples (in column attribute order), read without building any ORM object. Optional criteria
+    # narrow down the rows read.
+    @staticmethod
+    def query_rows(session_holder, model, *criteria):
+        columns = [column_attr.columns[0] for column_attr in inspect(model).column_attrs]
+        query = select(columns)
+        for criterion in criteria:
+            query = query.where(criterion)
+        db_session = session_holder()
+        rows = db_session.execute(query).fetchall()
+        db_session.close()
+
+        return [tuple(float(value) if isinstance(value, Decimal) else value for value in row) for row in rows]
+
+    # Rows as namedtuples, indexed by primary key.
+    @staticmethod
+    def index_rows(model, rows):
+        mapper = inspect(model)
+        column_attrs = list(mapper.column_attrs)
+        row_type = ROW_TYPES.get(model)
+        if not row_type:
+            row_type = ROW_TYPES.setdefault(model, namedtuple(model.__name__,
+                                                              [column_attr.key for column_attr in column_attrs]))
+        primary_key_index = [column_attr.columns[0] for column_attr in column_attrs].index(mapper.primary_key[0])
+
+        return {row[primary_key_index]: row_type(*row) for row in rows}
+
+    @staticmethod
+    def open():
+        global SNAPSHOT
+
+        if SNAPSHOT or not os.path.isfile(SNAPSHOT_PATH):
+            return
+
+        snapshot_file = open(SNAPSHOT_PATH, 'rb')
+        data = None
+        try:
+            data = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, python_major, python_minor, marshal_version, directory_size = \
+                unpack_from(HEADER_FORMAT, data, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_FORMAT_VERSION:
+                Logger.warning('Ignoring static data snapshot %s, unsupported format.' % SNAPSHOT_PATH)
+            elif (python_major, python_minor) != sys.version_info[:2] or marshal_version != marshal.version:
+                Logger.warning('Ignoring static data snapshot %s, built with Python %u.%u (marshal version %u), '
+                               'rebuild it.' % (SNAPSHOT_PATH, python_major, python_minor, marshal_version))
+            else:
+                directory = marshal.loads(data[HEADER_SIZE:HEADER_SIZE + directory_size])
+                SNAPSHOT = Snapshot(snapshot_file, data, directory, HEADER_SIZE + directory_size)
+                Logger.info('Using static data snapshot %s (%u tables).' % (SNAPSHOT_PATH, len(directory)))
+        except (ValueError, EOFError, TypeError, StructError) as e:
+            Logger.warning('Ignoring static data snapshot %s: %s' % (SNAPSHOT_PATH, e))
+        finally:
+            # Kept open only by a snapshot in use, anything else falls back to the database.
+            if not SNAPSHOT:
+                if data is not None:
+                    data.close()
+                snapshot_file.close()
+
+    # Returns None if the table is not in the snapshot (or it's outdated), it has to be read from the database.
+    @staticmethod
+    def get_rows(model):
+        SnapshotManager.open()
+        if not SNAPSHOT:
+            return None
+
+        table_name = SnapshotManager.get_table_name(model)
+        entry = SNAPSHOT.directory.get(table_name)
+        if not entry:
+            return None
+
+        schema, offset, size = entry
+        if schema != SnapshotManager.get_schema(model):
+            Logger.warning('Table %s changed since the static data snapshot was built, reading it from the database.'
+                           % table_name)
+            return None
+
+        offset += SNAPSHOT.tables_offset
+        try:
+            return marshal.loads(SNAPSHOT.data[offset:offset + size])
+        except (ValueError, EOFError, TypeError) as e:
+            Logger.warning('Unable to read table %s from the static data snapshot, reading it from the database: %s'
+                           % (table_name, e))
+            return None
+
+    @staticmethod
+    def build():
+        from database.dbc import DbcDatabaseManager, DbcModels
+        from database.world import WorldDatabaseManager, WorldModels
+
+        tables = [(model, DbcDatabaseManager.SessionHolder) for model in DbcModels.Base.__subclasses__()]
+        tables.append((WorldModels.ItemTemplate, WorldDatabaseManager.SessionHolder))
+
+        directory = dict()
+        blobs = []
+        offset = 0
+        for model, session_holder in tables:
+            blob = marshal.dumps(SnapshotManager.query_rows(session_holder, model))
+            directory[SnapshotManager.get_table_name(model)] = (SnapshotManager.get_schema(model), offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+
+        directory_blob = marshal.dumps(directory)
+
+        tmp_path = SNAPSHOT_PATH + '.tmp'
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        with open(tmp_path, 'wb') as snapshot_file:
+            snapshot_file.write(pack(HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, *sys.version_info[:2],
+                                     marshal.version, len(directory_blob)))
+            snapshot_file.write(directory_blob)
+            for blob in blobs:
+                snapshot_file.write(blob)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+
+        Logger.success('Static data snapshot written to %s (%u tables).' % (SNAPSHOT_PATH, len(tables)))
+
+
+if __name__ == '__main__':
+    SnapshotManager.build()
@@ -1,18 +1,28 @@
-from sqlalchemy import create_engine, func
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func
 from sqlalchemy.exc import StatementError
 from sqlalchemy.orm import sessionmaker, scoped_session
 from difflib import SequenceMatcher
 
+from database.DatabaseEngine import DatabaseEngine
 from database.world.WorldModels import *
+from database.snapshot.SnapshotManager import SnapshotManager
 from utils.ConfigManager import *
+from utils.Logger import Logger
 
-world_db_engine = create_engine('mysql+pymysql://%s:%s@%s/%s?charset=utf8mb4' % (config.Database.Connection.username,
-                                                                                 config.Database.Connection.password,
-                                                                                 config.Database.Connection.host,
-                                                                                 config.Database.DBNames.world_db),
-                                pool_pre_ping=True)
+world_db_engine = DatabaseEngine.create_engine(config.Database.DBNames.world_db)
 SessionHolder = scoped_session(sessionmaker(bind=world_db_engine, autocommit=True, autoflush=True))
 
+# item_template is read only, templates are either all preloaded or kept in a LRU as they are requested (misses too).
+# They are always namedtuples (see SnapshotManager.index_rows), whether they come from the snapshot or the database.
+ITEM_TEMPLATES = OrderedDict()
+ITEM_TEMPLATES_LOCK = threading.Lock()
+# area entry -> zone it belongs to (areas that are zones themselves map to their own entry).
+AREA_ZONES = dict()
+AREA_ZONES_LOCK = threading.Lock()
+
 
 class WorldDatabaseManager(object):
     # Player stuff
@@ -63,6 +73,25 @@ class WorldDatabaseManager(object):
         world_db_session.close()
         return res
 
+    @staticmethod
+    def area_zones_load():
+        world_db_session = SessionHolder()
+        res = world_db_session.query(AreaTemplate.entry, AreaTemplate.zone_id).all()
+        world_db_session.close()
+
+        with AREA_ZONES_LOCK:
+            AREA_ZONES.clear()
+            for entry, zone_id in res:
+                AREA_ZONES[entry] = zone_id if zone_id else entry
+        Logger.info('Loaded %u areas.' % len(res))
+
+    # Returns None for unknown areas.
+    @staticmethod
+    def area_get_zone_id(area_id):
+        if not AREA_ZONES:
+            WorldDatabaseManager.area_zones_load()
+        return AREA_ZONES.get(area_id)
+
     # Worldport stuff
 
     @staticmethod
@@ -82,11 +111,92 @@ class WorldDatabaseManager(object):
 
     @staticmethod
     def item_template_get_by_entry(entry):
-        world_db_session = SessionHolder()
-        res = world_db_session.query(ItemTemplate).filter_by(entry=entry).first()
-        world_db_session.close()
+        with ITEM_TEMPLATES_LOCK:
+            if entry in ITEM_TEMPLATES:
+                if not config.Server.Settings.preload_item_templates:
+                    ITEM_TEMPLATES.move_to_end(entry)
+                return ITEM_TEMPLATES[entry]
+            if config.Server.Settings.preload_item_templates and ITEM_TEMPLATES:
+                return None
+
+        res = WorldDatabaseManager.item_template_query(ItemTemplate.entry == entry).get(entry)
+
+        with ITEM_TEMPLATES_LOCK:
+            ITEM_TEMPLATES[entry] = res
+            if not config.Server.Settings.preload_item_templates:
+                while len(ITEM_TEMPLATES) > config.Server.Settings.item_template_cache_size:
+                    ITEM_TEMPLATES.popitem(last=False)
         return res
 
+    # Resolves many templates at once, whatever isn't cached yet is read with a single query.
+    # Returns {entry: template}, entries that don't exist are left out.
+    @staticmethod
+    def item_template_get_by_entries(entries):
+        item_templates = dict()
+        missing = []
+        with ITEM_TEMPLATES_LOCK:
+            for entry in set(entries):
+                if entry in ITEM_TEMPLATES:
+                    if not config.Server.Settings.preload_item_templates:
+                        ITEM_TEMPLATES.move_to_end(entry)
+                    item_templates[entry] = ITEM_TEMPLATES[entry]
+                else:
+                    missing.append(entry)
+            if config.Server.Settings.preload_item_templates and ITEM_TEMPLATES:
+                missing = []
+
+        if missing:
+            item_templates.update(WorldDatabaseManager.item_template_query(ItemTemplate.entry.in_(missing)))
+
+            with ITEM_TEMPLATES_LOCK:
+                for entry in missing:
+                    ITEM_TEMPLATES[entry] = item_templates.get(entry)
+                if not config.Server.Settings.preload_item_templates:
+                    while len(ITEM_TEMPLATES) > config.Server.Settings.item_template_cache_size:
+                        ITEM_TEMPLATES.popitem(last=False)
+
+        return {entry: item_template for entry, item_template in item_templates.items() if item_template}
+
+    @staticmethod
+    def item_template_preload():
+        if not config.Server.Settings.preload_item_templates:
+            return
+
+        rows = SnapshotManager.get_rows(ItemTemplate)
+        if rows is not None:
+            item_templates = SnapshotManager.index_rows(ItemTemplate, rows)
+        else:
+            item_templates = WorldDatabaseManager.item_template_query()
+
+        with ITEM_TEMPLATES_LOCK:
+            ITEM_TEMPLATES.clear()
+            ITEM_TEMPLATES.update(item_templates)
+        Logger.info('Loaded %u item templates.' % len(item_templates))
+
+    # Drops a single template (or all of them) so it's read again from the database, preloaded templates are
+    # reloaded right away.
+    @staticmethod
+    def item_template_reload(entry=None):
+        if entry is None:
+            with ITEM_TEMPLATES_LOCK:
+                ITEM_TEMPLATES.clear()
+            WorldDatabaseManager.item_template_preload()
+            return
+
+        with ITEM_TEMPLATES_LOCK:
+            ITEM_TEMPLATES.pop(entry, None)
+        if config.Server.Settings.preload_item_templates:
+            item_template = WorldDatabaseManager.item_template_query(ItemTemplate.entry == entry).get(entry)
+            if item_template:
+                with ITEM_TEMPLATES_LOCK:
+                    ITEM_TEMPLATES[entry] = item_template
+
+    # {entry: template} of the templates matching the criteria (all of them if none), same rows as the snapshot.
+    @staticmethod
+    def item_template_query(*criteria):
+        return SnapshotManager.index_rows(ItemTemplate, SnapshotManager.query_rows(SessionHolder, ItemTemplate,
+                                                                                   *criteria))
+
     # Page text stuff
 
     @staticmethod
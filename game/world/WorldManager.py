@@ -1,16 +1,21 @@
+import asyncio
 import socketserver
 import threading
 import socket
 
 from struct import pack
 from time import sleep
-from apscheduler.schedulers.background import BackgroundScheduler
 
 from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from game.world.WorldTickHandler import WorldTickHandler
 from game.world.managers.GridManager import GridManager
+from game.world.managers.PersistenceManager import PersistenceManager
 from game.world.opcode_handling.Definitions import Definitions
 from network.packet.PacketWriter import *
 from network.packet.PacketReader import *
+from network.packet.PacketBuffer import PacketBuffer
+from network.packet.PacketQueue import PacketQueue
+from network.packet.UpdatePacketFactory import UpdatePacketFactory
 from database.realm.RealmDatabaseManager import *
 from database.dbc.DbcDatabaseManager import *
 from database.world.WorldDatabaseManager import *
@@ -18,11 +23,113 @@ from database.world.WorldDatabaseManager import *
 from utils.Logger import Logger
 
 
+# Pending update blocks are sent right away once they reach this size, so packets stay well below the 64KB limit.
+MAX_UPDATE_BLOCKS_SIZE = 0x8000
+
+
 class ThreadedWorldServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     pass
 
 
-class WorldServerSessionHandler(socketserver.BaseRequestHandler):
+class WorldSession(object):
+    # Session state and packet dispatching shared by the threaded and the asyncio world servers.
+
+    def disconnect(self):
+        if self.is_alive:
+            try:
+                if self.player_mgr:
+                    self.player_mgr.logout()
+            except AttributeError:
+                pass
+
+            self.keep_alive = False
+            self.is_alive = False
+            WorldSessionStateHandler.remove(self)
+
+            # Let the writer send whatever is still queued (e.g. a failed auth response) before closing.
+            self.outgoing_queue.close()
+            self.stop_outgoing()
+
+            try:
+                self.request.shutdown(socket.SHUT_RDWR)
+                self.request.close()
+            except OSError:
+                pass
+
+    def init_update_blocks(self):
+        self.update_blocks = []
+        self.update_blocks_size = 0
+        self.update_lock = threading.RLock()
+
+    # Object updates are batched into a single SMSG_UPDATE_OBJECT, sent at the end of the world tick or before any
+    # other packet, so the order packets were enqueued in is kept.
+    def enqueue_update_block(self, update_block):
+        with self.update_lock:
+            if self.update_blocks_size + len(update_block) > MAX_UPDATE_BLOCKS_SIZE:
+                self.flush_update_blocks()
+            self.update_blocks.append(update_block)
+            self.update_blocks_size += len(update_block)
+
+    def flush_update_blocks(self):
+        with self.update_lock:
+            if self.update_blocks:
+                update_packet = UpdatePacketFactory.get_update_object_packet(self.update_blocks)
+                self.update_blocks = []
+                self.update_blocks_size = 0
+                self._enqueue(update_packet)
+
+    def enqueue_packet(self, data):
+        with self.update_lock:
+            self.flush_update_blocks()
+            self._enqueue(data)
+
+    def _enqueue(self, data):
+        if not self.outgoing_queue.put(data):
+            Logger.warning('[%s] Outgoing queue reached %u bytes, disconnecting slow client.' % (
+                self.client_address[0], self.outgoing_queue.high_water_mark))
+            self.outgoing_queue.close()
+            self.drop_connection()
+
+    # override
+    def stop_outgoing(self):
+        pass
+
+    # override
+    def drop_connection(self):
+        pass
+
+    # Disconnects from code that must not wait for it (database callbacks on the world tick), the logout save and the
+    # socket teardown run later on the session's own thread or the event loop. Whatever is queued is still sent.
+    # override
+    def request_disconnect(self):
+        pass
+
+    def auth_challenge(self):
+        data = pack('<6B', 0, 0, 0, 0, 0, 0)
+        self.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_AUTH_CHALLENGE, data))
+
+    def handle_packets(self, sck, packets):
+        # Packets can arrive coalesced, dispatch every complete one received in this wakeup.
+        if packets is None:
+            Logger.warning('[%s] Received malformed packet header, disconnecting.' % self.client_address[0])
+            return -1
+
+        for reader in packets:
+            if self.handle_packet(sck, reader) != 0:
+                return -1
+        return 0
+
+    def handle_packet(self, sck, reader):
+        if reader.opcode:
+            handler = Definitions.get_handler_from_packet(self, reader.opcode)
+            if handler:
+                Logger.debug('[%s] Handling %s' % (self.client_address[0], OpCode(reader.opcode)))
+                if handler(self, sck, reader) != 0:
+                    return -1
+        return 0
+
+
+class WorldServerSessionHandler(WorldSession, socketserver.BaseRequestHandler):
     def __init__(self, request, client_address, server):
         super().__init__(request, client_address, server)
 
@@ -34,19 +141,20 @@ class WorldServerSessionHandler(socketserver.BaseRequestHandler):
 
     def handle(self):
         try:
-            self.auth_challenge(self.request)
-
             self.player_mgr = None
             self.account_mgr = None
+            self.incoming_buffer = PacketBuffer()
+            self.outgoing_queue = PacketQueue(config.Server.Settings.outgoing_high_water_mark_bytes)
+            self.init_update_blocks()
 
             self.keep_alive = True
             self.is_alive = True
 
-            realm_saving_scheduler = BackgroundScheduler()
-            realm_saving_scheduler._daemon = True
-            realm_saving_scheduler.add_job(self.save_character, 'interval',
-                                           seconds=config.Server.Settings.realm_saving_interval_seconds)
-            realm_saving_scheduler.start()
+            self.outgoing_thread = threading.Thread(target=self.process_outgoing)
+            self.outgoing_thread.daemon = True
+            self.outgoing_thread.start()
+
+            self.auth_challenge()
 
             while self.receive(self.request) != -1 and self.keep_alive:
                 sleep(0.001)
@@ -54,61 +162,64 @@ class WorldServerSessionHandler(socketserver.BaseRequestHandler):
         finally:
             self.disconnect()
 
-    def disconnect(self):
-        if self.is_alive:
-            try:
-                if self.player_mgr:
-                    self.player_mgr.logout()
-            except AttributeError:
-                pass
+    def receive(self, sck):
+        try:
+            received = sck.recv_into(self.incoming_buffer.get_write_buffer())
+            if received > 0:
+                self.incoming_buffer.commit(received)
+                return self.handle_packets(sck, self.incoming_buffer.read_packets())
+            else:
+                return -1
+        except OSError:
+            self.disconnect()
+            return -1
 
-            self.keep_alive = False
-            self.is_alive = False
-            WorldSessionStateHandler.remove(self)
+    def process_outgoing(self):
+        while True:
+            self.outgoing_queue.wait_for_flush()
+            packets = self.outgoing_queue.take_all()
+            if not packets and self.outgoing_queue.is_closed:
+                break
 
             try:
-                self.request.shutdown(socket.SHUT_RDWR)
-                self.request.close()
+                PacketQueue.send_packets(self.request, packets)
             except OSError:
-                pass
+                break
+
+    # override
+    def stop_outgoing(self):
+        if threading.current_thread() != self.outgoing_thread:
+            self.outgoing_thread.join(timeout=1)
 
-    def save_character(self):
+    # override
+    def drop_connection(self):
+        # Unblocks both recv and sendall, the session thread then takes care of the disconnection.
         try:
-            self.player_mgr.sync_player()
-            RealmDatabaseManager.character_update(self.player_mgr.player)
-        except AttributeError:
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
             pass
 
-    def auth_challenge(self, sck):
-        data = pack('<6B', 0, 0, 0, 0, 0, 0)
-        sck.sendall(PacketWriter.get_packet(OpCode.SMSG_AUTH_CHALLENGE, data))
-
-    def receive(self, sck):
+    # override
+    def request_disconnect(self):
+        # Only unblocks recv, the writer keeps sending until disconnect() closes the queue.
+        self.keep_alive = False
         try:
-            data = sck.recv(2048)
-            if len(data) > 0:
-                reader = PacketReader(data)
-                if reader.opcode:
-                    handler = Definitions.get_handler_from_packet(self, reader.opcode)
-                    if handler:
-                        Logger.debug('[%s] Handling %s' % (self.client_address[0], OpCode(reader.opcode)))
-                        if handler(self, sck, reader) != 0:
-                            return -1
-            else:
-                return -1
+            self.request.shutdown(socket.SHUT_RD)
         except OSError:
-            self.disconnect()
-            return -1
+            pass
 
     @staticmethod
     def schedule_updates():
-        player_update_scheduler = BackgroundScheduler()
-        player_update_scheduler._daemon = True
-        player_update_scheduler.add_job(WorldSessionStateHandler.update_players, 'interval', seconds=0.05)
-        player_update_scheduler.start()
+        world_tick_thread = threading.Thread(target=WorldTickHandler().run)
+        world_tick_thread.daemon = True
+        world_tick_thread.start()
 
     @staticmethod
     def start():
+        DbcDatabaseManager.load_tables()
+        WorldDatabaseManager.item_template_preload()
+        WorldDatabaseManager.area_zones_load()
+        PersistenceManager.start()
         Logger.success('World server started.')
 
         WorldServerSessionHandler.schedule_updates()
@@ -120,3 +231,133 @@ class WorldServerSessionHandler(socketserver.BaseRequestHandler):
             world_session_thread = threading.Thread(target=world_instance.serve_forever())
             world_session_thread.daemon = True
             world_session_thread.start()
+
+
+class TransportSocket(object):
+    # Socket-like wrapper around an asyncio transport, so sessions can be closed the same way no matter which
+    # world server mode is running. Calls coming from other threads are handed over to the event loop.
+
+    def __init__(self, loop, transport):
+        self.loop = loop
+        self.transport = transport
+        self.loop_thread_id = threading.get_ident()
+
+    def call_soon(self, callback, *args):
+        if threading.get_ident() == self.loop_thread_id:
+            self.loop.call_soon(callback, *args)
+        else:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        self.call_soon(self.loop.call_later, delay, callback, *args)
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        self.call_soon(self.transport.close)
+
+    def abort(self):
+        self.call_soon(self.transport.abort)
+
+
+class AsyncWorldServerSessionHandler(WorldSession, asyncio.BufferedProtocol):
+    def __init__(self):
+        self.request = None
+        self.client_address = None
+
+        self.account_mgr = None
+        self.player_mgr = None
+
+        self.keep_alive = False
+        self.is_alive = False
+
+        self.incoming_buffer = PacketBuffer()
+        self.outgoing_queue = PacketQueue(config.Server.Settings.outgoing_high_water_mark_bytes,
+                                          on_flush=self.schedule_outgoing)
+        self.init_update_blocks()
+
+    def connection_made(self, transport):
+        loop = asyncio.get_event_loop()
+
+        self.request = TransportSocket(loop, transport)
+        self.client_address = transport.get_extra_info('peername')
+
+        self.keep_alive = True
+        self.is_alive = True
+
+        self.auth_challenge()
+
+    def get_buffer(self, sizehint):
+        return self.incoming_buffer.get_write_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.incoming_buffer.commit(nbytes)
+        if not self.keep_alive:
+            return
+
+        if self.handle_packets(self.request, self.incoming_buffer.read_packets()) != 0:
+            self.disconnect()
+
+    def connection_lost(self, exc):
+        self.disconnect()
+
+    def schedule_outgoing(self):
+        self.request.call_soon(self.process_outgoing)
+
+    # The transport is the single writer here, it already buffers whatever the socket can't take right away.
+    # Python 3.12+ transports flush writelines() with sendmsg, older ones join the packets first.
+    def process_outgoing(self):
+        transport = self.request.transport
+        packets = self.outgoing_queue.take_all()
+        if not packets or transport.is_closing():
+            return
+
+        transport.writelines(packets)
+        if transport.get_write_buffer_size() > self.outgoing_queue.high_water_mark:
+            Logger.warning('[%s] Write buffer reached %u bytes, disconnecting slow client.' % (
+                self.client_address[0], self.outgoing_queue.high_water_mark))
+            self.outgoing_queue.close()
+            self.drop_connection()
+
+    # override
+    def stop_outgoing(self):
+        self.request.call_soon(self.process_outgoing)
+
+    # override
+    def drop_connection(self):
+        self.request.abort()
+
+    # override
+    def request_disconnect(self):
+        self.keep_alive = False
+        self.request.call_soon(self.disconnect)
+
+    @staticmethod
+    def schedule_updates(loop):
+        WorldTickHandler().schedule(loop)
+
+    @staticmethod
+    def start():
+        DbcDatabaseManager.load_tables()
+        WorldDatabaseManager.item_template_preload()
+        WorldDatabaseManager.area_zones_load()
+        PersistenceManager.start()
+        Logger.success('World server started (asyncio).')
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        world_instance = loop.run_until_complete(
+            loop.create_server(AsyncWorldServerSessionHandler,
+                               config.Server.Connection.RealmServer.host,
+                               config.Server.Connection.WorldServer.port,
+                               reuse_address=True))
+        AsyncWorldServerSessionHandler.schedule_updates(loop)
+
+        try:
+            loop.run_forever()
+        finally:
+            world_instance.close()
+            loop.run_until_complete(world_instance.wait_closed())
+            loop.close()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from utils.ConfigManager import config
+from utils.Logger import Logger
+
+# Number of slots, jobs further away than this many ticks just wait for the wheel to come around again.
+WHEEL_SIZE = 512
+WHEEL = [[] for _ in range(WHEEL_SIZE)]
+WHEEL_LOCK = threading.Lock()
+
+
+class ScheduledJob(object):
+    def __init__(self, callback, ticks, repeat):
+        self.callback = callback
+        self.ticks = ticks
+        self.repeat = repeat
+        self.expire_tick = 0
+
+
+class WorldScheduler(object):
+    # Process-wide timer wheel advanced by the world tick, every job runs on the world tick thread (or event loop).
+    # Registering and running a job are O(1), no matter how many jobs are scheduled.
+
+    interval = config.Server.Settings.world_tick_interval_seconds
+    start_time = None
+    current_tick = 0
+
+    @staticmethod
+    def add_job(callback, seconds, repeat=True):
+        job = ScheduledJob(callback, max(1, round(seconds / WorldScheduler.interval)), repeat)
+        with WHEEL_LOCK:
+            WorldScheduler._insert(job)
+        return job
+
+    # Called every world tick. Ticks are counted from the elapsed time, so jobs aren't delayed when ticks are skipped.
+    @staticmethod
+    def advance():
+        now = time.monotonic()
+        if WorldScheduler.start_time is None:
+            WorldScheduler.start_time = now
+        target_tick = int((now - WorldScheduler.start_time) / WorldScheduler.interval)
+
+        due_jobs = []
+        with WHEEL_LOCK:
+            first_tick = WorldScheduler.current_tick + 1
+            # After a full turn every slot has been checked already.
+            last_tick = min(target_tick, WorldScheduler.current_tick + WHEEL_SIZE)
+            WorldScheduler.current_tick = target_tick
+
+            for tick in range(first_tick, last_tick + 1):
+                slot = WHEEL[tick % WHEEL_SIZE]
+                if not slot:
+                    continue
+
+                pending_jobs = []
+                for job in slot:
+                    if job.expire_tick <= target_tick:
+                        due_jobs.append(job)
+                    else:
+                        pending_jobs.append(job)
+                slot[:] = pending_jobs
+
+        due_jobs.sort(key=lambda job: job.expire_tick)
+        for job in due_jobs:
+            try:
+                job.callback()
+            except Exception as e:
+                Logger.error('Error running scheduled job %s: %s' % (job.callback, e))
+
+            if job.repeat:
+                with WHEEL_LOCK:
+                    WorldScheduler._insert(job)
+
+    @staticmethod
+    def _insert(job):
+        job.expire_tick = WorldScheduler.current_tick + job.ticks
+        WHEEL[job.expire_tick % WHEEL_SIZE].append(job)
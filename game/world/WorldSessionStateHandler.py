@@ -1,64 +1,106 @@
 import threading
-from time import time
 
-WORLD_SESSIONS = []
+from utils.Logger import Logger
+
+# Authenticated sessions, in the order they were added (dict used as an ordered set).
+WORLD_SESSIONS = dict()
+SESSIONS_BY_ACCOUNT_ID = dict()
+# Only sessions with a player in world.
+SESSIONS_BY_CHARACTER_GUID = dict()
+SESSIONS_BY_CHARACTER_NAME = dict()  # Lowercase names
+SESSIONS_LOCK = threading.RLock()
 
 
 class WorldSessionStateHandler(object):
 
     @staticmethod
     def add(session):
-        if session not in WORLD_SESSIONS:
-            WORLD_SESSIONS.append(session)
+        with SESSIONS_LOCK:
+            WORLD_SESSIONS[session] = None
+            SESSIONS_BY_ACCOUNT_ID[session.account_mgr.account.id] = session
 
     @staticmethod
     def remove(session):
-        if session in WORLD_SESSIONS:
-            WORLD_SESSIONS.remove(session)
+        with SESSIONS_LOCK:
+            WorldSessionStateHandler.remove_player(session)
+            if session in WORLD_SESSIONS:
+                del WORLD_SESSIONS[session]
+                account_id = session.account_mgr.account.id
+                if SESSIONS_BY_ACCOUNT_ID.get(account_id) is session:
+                    del SESSIONS_BY_ACCOUNT_ID[account_id]
+
+    # Indexes the session by its player, once it's in world.
+    @staticmethod
+    def add_player(session):
+        with SESSIONS_LOCK:
+            SESSIONS_BY_CHARACTER_GUID[session.player_mgr.guid] = session
+            SESSIONS_BY_CHARACTER_NAME[session.player_mgr.player.name.lower()] = session
+
+    @staticmethod
+    def remove_player(session):
+        with SESSIONS_LOCK:
+            player_mgr = session.player_mgr
+            if player_mgr:
+                if SESSIONS_BY_CHARACTER_GUID.get(player_mgr.guid) is session:
+                    del SESSIONS_BY_CHARACTER_GUID[player_mgr.guid]
+                name = player_mgr.player.name.lower()
+                if SESSIONS_BY_CHARACTER_NAME.get(name) is session:
+                    del SESSIONS_BY_CHARACTER_NAME[name]
 
     @staticmethod
     def disonnect_old_session(new_session):
-        for session in WORLD_SESSIONS:
-            if session.account_mgr and session.account_mgr.account.id == new_session.account_mgr.account.id:
-                session.disconnect()
-                break
+        session = WorldSessionStateHandler.get_session_by_account_id(new_session.account_mgr.account.id)
+        if session and session is not new_session:
+            # The logout queues the character's final save right away, so the new session can't load it before it's
+            # written. The rest of the teardown is left to the old session's thread, this runs on the world tick.
+            if session.player_mgr:
+                session.player_mgr.logout()
+            session.request_disconnect()
 
     @staticmethod
     def get_world_sessions():
-        return list(WORLD_SESSIONS)
+        with SESSIONS_LOCK:
+            return list(WORLD_SESSIONS)
+
+    @staticmethod
+    def get_online_players():
+        with SESSIONS_LOCK:
+            return [session.player_mgr for session in SESSIONS_BY_CHARACTER_GUID.values()
+                    if session.player_mgr and session.player_mgr.is_online]
 
     @staticmethod
     def get_session_by_account_id(account_id):
-        for session in WORLD_SESSIONS:
-            if session.account_mgr and session.account_mgr.account.id == account_id:
-                return session
-        return None
+        return SESSIONS_BY_ACCOUNT_ID.get(account_id)
 
     @staticmethod
     def get_session_by_character_guid(character_guid):
-        for session in WORLD_SESSIONS:
-            if session.player_mgr and session.player_mgr.guid == character_guid:
-                return session
-        return None
+        return SESSIONS_BY_CHARACTER_GUID.get(character_guid)
 
     @staticmethod
     def find_player_by_guid(guid_to_search):
-        for session in WORLD_SESSIONS:
-            if session.player_mgr and session.player_mgr.is_online:
-                if session.player_mgr == guid_to_search:
-                    return session.player_mgr
+        session = SESSIONS_BY_CHARACTER_GUID.get(guid_to_search)
+        if session and session.player_mgr and session.player_mgr.is_online:
+            return session.player_mgr
         return None
 
     @staticmethod
     def find_player_by_name(name_to_search):
-        for session in WORLD_SESSIONS:
-            if session.player_mgr and session.player_mgr.is_online:
-                if session.player_mgr.player.name.lower() == name_to_search.lower():
-                    return session.player_mgr
+        session = SESSIONS_BY_CHARACTER_NAME.get(name_to_search.lower())
+        if session and session.player_mgr and session.player_mgr.is_online:
+            return session.player_mgr
         return None
 
     @staticmethod
     def update_players():
-        for session in WORLD_SESSIONS:
-            if session.player_mgr and session.player_mgr.is_online:
-                threading.Thread(target=session.player_mgr.update).start()
+        for session in WorldSessionStateHandler.get_world_sessions():
+            player_mgr = session.player_mgr
+            if player_mgr and player_mgr.is_online:
+                try:
+                    player_mgr.update()
+                except Exception as e:
+                    Logger.error('Error updating player %u: %s' % (player_mgr.guid, e))
+
+    @staticmethod
+    def flush_update_blocks():
+        for session in WorldSessionStateHandler.get_world_sessions():
+            session.flush_update_blocks()
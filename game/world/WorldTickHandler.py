@@ -0,0 +1,73 @@
+import time
+
+from database.DatabaseExecutor import DatabaseExecutor
+from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from game.world.WorldScheduler import WorldScheduler
+from network.packet.PacketQueue import PacketQueue
+from utils.ConfigManager import config
+from utils.Logger import Logger
+
+# How far behind (in ticks) the loop may fall before missed ticks are dropped instead of caught up.
+MAX_CATCH_UP_TICKS = 5
+
+
+class WorldTickHandler(object):
+    # Fixed timestep loop updating the whole world in one pass per tick. Updates use the real elapsed time, so
+    # when the server falls too far behind it's safe to skip the missed ticks instead of running them all.
+
+    def __init__(self, interval=config.Server.Settings.world_tick_interval_seconds):
+        self.interval = interval
+        self.next_tick = 0
+
+        self.tick_count = 0
+        self.last_tick_duration = 0
+        self.max_tick_duration = 0
+        self.overran_ticks = 0
+        self.skipped_ticks = 0
+
+    def tick(self):
+        start = time.monotonic()
+
+        DatabaseExecutor.dispatch_callbacks()
+        WorldSessionStateHandler.update_players()
+        WorldSessionStateHandler.flush_update_blocks()
+        WorldScheduler.advance()
+        PacketQueue.flush_all()
+
+        self.tick_count += 1
+        self.last_tick_duration = time.monotonic() - start
+        if self.last_tick_duration > self.max_tick_duration:
+            self.max_tick_duration = self.last_tick_duration
+        if self.last_tick_duration > self.interval:
+            self.overran_ticks += 1
+
+    # Returns how long to wait before the next tick, 0 if it's already due (catching up).
+    def get_next_tick_delay(self):
+        now = time.monotonic()
+        self.next_tick += self.interval
+
+        behind = now - self.next_tick
+        if behind > self.interval * MAX_CATCH_UP_TICKS:
+            skipped = int(behind / self.interval)
+            self.skipped_ticks += skipped
+            self.next_tick = now
+            Logger.warning('World tick is %u ticks behind (last tick took %.2f ms), skipping them.' % (
+                skipped, self.last_tick_duration * 1000))
+
+        return max(0, self.next_tick - now)
+
+    def run(self):
+        self.next_tick = time.monotonic()
+        while True:
+            self.tick()
+            delay = self.get_next_tick_delay()
+            if delay > 0:
+                time.sleep(delay)
+
+    def schedule(self, loop):
+        def async_tick():
+            self.tick()
+            loop.call_later(self.get_next_tick_delay(), async_tick)
+
+        self.next_tick = time.monotonic()
+        loop.call_soon(async_tick)
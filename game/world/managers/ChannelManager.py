@@ -0,0 +1,188 @@
+import threading
+from struct import pack
+
+from database.world.WorldDatabaseManager import WorldDatabaseManager
+from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from network.packet.PacketWriter import PacketWriter, OpCode
+from utils.ConfigManager import config
+from utils.constants.ObjectCodes import ChatMsgs, ChatFlags, ChannelNotifications
+
+# (lowercase name, zone) -> Channel, zone is 0 for world-wide channels.
+CHANNELS = dict()
+CHANNELS_LOCK = threading.RLock()
+ZONE_CHANNELS = {name.lower() for name in config.World.Chat.Channels.zone_channels}
+
+
+class Channel(object):
+    def __init__(self, name, zone=0, password=''):
+        self.name = name
+        self.zone = zone
+        self.password = password
+        self.members = dict()  # guid -> player_mgr
+
+    def get_key(self):
+        return self.name.lower(), self.zone
+
+    # Same packet for every member, built once.
+    def broadcast(self, packet, exclude=None):
+        for guid, player_mgr in list(self.members.items()):
+            if guid != exclude and player_mgr.session:
+                player_mgr.session.enqueue_packet(packet)
+
+
+class ChannelManager(object):
+    # Chat channels backed by subscriber sets, a message only goes to the members of its channel. Every player keeps
+    # the channels it joined in player_mgr.channels (lowercase name -> Channel).
+
+    @staticmethod
+    def join(player_mgr, name, password=''):
+        with CHANNELS_LOCK:
+            if name.lower() in player_mgr.channels:
+                return
+
+            key = ChannelManager._get_channel_key(player_mgr, name)
+            channel = CHANNELS.get(key)
+            if not channel:
+                channel = Channel(name, key[1], password)
+                CHANNELS[key] = channel
+            elif channel.password and channel.password != password:
+                player_mgr.session.enqueue_packet(
+                    ChannelManager._get_notify_packet(ChannelNotifications.WRONG_PASSWORD, channel.name))
+                return
+
+            ChannelManager._add_member(channel, player_mgr)
+            player_mgr.session.enqueue_packet(
+                ChannelManager._get_notify_packet(ChannelNotifications.YOU_JOINED, channel.name))
+
+    @staticmethod
+    def leave(player_mgr, name):
+        with CHANNELS_LOCK:
+            channel = player_mgr.channels.get(name.lower())
+            if not channel:
+                player_mgr.session.enqueue_packet(
+                    ChannelManager._get_notify_packet(ChannelNotifications.NOT_MEMBER, name))
+                return
+
+            ChannelManager._remove_member(channel, player_mgr)
+            player_mgr.session.enqueue_packet(
+                ChannelManager._get_notify_packet(ChannelNotifications.YOU_LEFT, channel.name))
+
+    # Logout.
+    @staticmethod
+    def leave_all(player_mgr):
+        with CHANNELS_LOCK:
+            for channel in list(player_mgr.channels.values()):
+                ChannelManager._remove_member(channel, player_mgr)
+
+    # Moves the player to the instance of its zone channels that belongs to the zone it just entered.
+    @staticmethod
+    def update_zone(player_mgr):
+        with CHANNELS_LOCK:
+            for channel in list(player_mgr.channels.values()):
+                key = ChannelManager._get_channel_key(player_mgr, channel.name)
+                if key == channel.get_key():
+                    continue
+
+                ChannelManager._remove_member(channel, player_mgr)
+                player_mgr.session.enqueue_packet(
+                    ChannelManager._get_notify_packet(ChannelNotifications.YOU_LEFT, channel.name))
+
+                # Same check as join(), the only password the player is known to have is the one of the channel it left.
+                new_channel = CHANNELS.get(key)
+                if not new_channel:
+                    new_channel = Channel(channel.name, key[1], channel.password)
+                    CHANNELS[key] = new_channel
+                elif new_channel.password and new_channel.password != channel.password:
+                    player_mgr.session.enqueue_packet(
+                        ChannelManager._get_notify_packet(ChannelNotifications.WRONG_PASSWORD, new_channel.name))
+                    continue
+
+                ChannelManager._add_member(new_channel, player_mgr)
+                player_mgr.session.enqueue_packet(
+                    ChannelManager._get_notify_packet(ChannelNotifications.YOU_JOINED, new_channel.name))
+
+    @staticmethod
+    def send_message(player_mgr, name, message, lang):
+        channel = player_mgr.channels.get(name.lower())
+        if not channel:
+            player_mgr.session.enqueue_packet(
+                ChannelManager._get_notify_packet(ChannelNotifications.NOT_MEMBER, name))
+            return
+
+        channel_bytes = PacketWriter.string_to_bytes(channel.name)
+        message_bytes = PacketWriter.string_to_bytes(message)
+        data = pack(
+            '<BI%usQ%usB' % (len(channel_bytes), len(message_bytes)),
+            ChatMsgs.CHAT_MSG_CHANNEL,
+            lang,
+            channel_bytes,
+            player_mgr.guid,
+            message_bytes,
+            player_mgr.chat_flags
+        )
+        with CHANNELS_LOCK:
+            channel.broadcast(PacketWriter.get_packet(OpCode.SMSG_MESSAGECHAT, data))
+
+    @staticmethod
+    def send_list(player_mgr, name):
+        channel = player_mgr.channels.get(name.lower())
+        if not channel:
+            player_mgr.session.enqueue_packet(
+                ChannelManager._get_notify_packet(ChannelNotifications.NOT_MEMBER, name))
+            return
+
+        with CHANNELS_LOCK:
+            members = list(channel.members)
+        channel_bytes = PacketWriter.string_to_bytes(channel.name)
+        data = pack('<%usBI' % len(channel_bytes), channel_bytes, 0, len(members))
+        for guid in members:
+            data += pack('<QB', guid, 0)
+        player_mgr.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_CHANNEL_LIST, data))
+
+    # System message to every player online, built once.
+    @staticmethod
+    def announce(message):
+        message_bytes = PacketWriter.string_to_bytes(message)
+        data = pack(
+            '<BIQ%usB' % len(message_bytes),
+            ChatMsgs.CHAT_MSG_SYSTEM,
+            0,
+            0,
+            message_bytes,
+            ChatFlags.CHAT_TAG_NONE
+        )
+        packet = PacketWriter.get_packet(OpCode.SMSG_MESSAGECHAT, data)
+        for player_mgr in WorldSessionStateHandler.get_online_players():
+            player_mgr.session.enqueue_packet(packet)
+
+    @staticmethod
+    def _add_member(channel, player_mgr):
+        channel.broadcast(ChannelManager._get_notify_packet(ChannelNotifications.JOINED, channel.name,
+                                                            player_mgr.guid))
+        channel.members[player_mgr.guid] = player_mgr
+        player_mgr.channels[channel.name.lower()] = channel
+
+    @staticmethod
+    def _remove_member(channel, player_mgr):
+        channel.members.pop(player_mgr.guid, None)
+        player_mgr.channels.pop(channel.name.lower(), None)
+        if channel.members:
+            channel.broadcast(ChannelManager._get_notify_packet(ChannelNotifications.LEFT, channel.name,
+                                                                player_mgr.guid))
+        else:
+            CHANNELS.pop(channel.get_key(), None)
+
+    @staticmethod
+    def _get_channel_key(player_mgr, name):
+        zone = 0
+        if name.lower() in ZONE_CHANNELS:
+            zone = WorldDatabaseManager.area_get_zone_id(player_mgr.zone) or player_mgr.zone
+        return name.lower(), zone
+
+    @staticmethod
+    def _get_notify_packet(notification, name, guid=None):
+        name_bytes = PacketWriter.string_to_bytes(name)
+        data = pack('<B%us' % len(name_bytes), notification, name_bytes)
+        if guid is not None:
+            data += pack('<Q', guid)
+        return PacketWriter.get_packet(OpCode.SMSG_CHANNEL_NOTIFY, data)
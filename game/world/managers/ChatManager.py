@@ -9,7 +9,7 @@ class ChatManager(object):
 
     @staticmethod
     def send_system_message(world_session, message):
-        world_session.request.sendall(ChatManager._get_message_packet(world_session.player_mgr.guid,
+        world_session.enqueue_packet(ChatManager._get_message_packet(world_session.player_mgr.guid,
                                                                       ChatFlags.CHAT_TAG_NONE,
                                                                       message, ChatMsgs.CHAT_MSG_SYSTEM, 0))
 
@@ -24,10 +24,10 @@ class ChatManager(object):
     def send_whisper(sender, receiver, message, lang):
         sender_packet = ChatManager._get_message_packet(receiver.guid, receiver.chat_flags, message,
                                                         ChatMsgs.CHAT_MSG_WHISPER_INFORM, lang)
-        sender.session.request.sendall(sender_packet)
+        sender.session.enqueue_packet(sender_packet)
         receiver_packet = ChatManager._get_message_packet(sender.guid, sender.chat_flags, message,
                                                           ChatMsgs.CHAT_MSG_WHISPER, lang)
-        receiver.session.request.sendall(receiver_packet)
+        receiver.session.enqueue_packet(receiver_packet)
 
     @staticmethod
     def _get_message_packet(guid, chat_flags, message, chat_type, lang):
@@ -5,8 +5,12 @@ from game.world.managers.GridManager import GridManager
 from game.world.managers.abstractions.Vector import Vector
 from network.packet.PacketWriter import PacketWriter, OpCode
 from game.world.managers.ChatManager import ChatManager
+from game.world.managers.ChannelManager import ChannelManager
 from database.world.WorldDatabaseManager import WorldDatabaseManager
 from database.realm.RealmDatabaseManager import RealmDatabaseManager
+from database.DatabaseEngine import DatabaseEngine
+from database.DatabaseExecutor import DatabaseExecutor
+from utils.ConfigManager import config
 
 
 class CommandManager(object):
@@ -194,10 +198,7 @@ class CommandManager(object):
     @staticmethod
     def ann(world_session, args):
         ann = str(args)
-
-        for session in WorldSessionStateHandler.get_world_sessions():
-            if session.player_mgr and session.player_mgr.is_online:
-                ChatManager.send_system_message(session, '[SERVER] %s' % ann)
+        ChannelManager.announce('[SERVER] %s' % ann)
 
         return 0, ''
 
@@ -241,6 +242,29 @@ class CommandManager(object):
         except ValueError:
             return -1, 'please specify a valid item entry.'
 
+    @staticmethod
+    def reloaditems(world_session, args):
+        try:
+            entry = int(args) if args else None
+            WorldDatabaseManager.item_template_reload(entry)
+            return 0, 'Item templates reloaded.' if entry is None else 'Item template %u reloaded.' % entry
+        except ValueError:
+            return -1, 'please specify a valid item entry.'
+
+    @staticmethod
+    def dbstats(world_session, args):
+        for db_name, pool in DatabaseEngine.get_pool_stats().items():
+            ChatManager.send_system_message(world_session, '%s: %u/%u connections in use (%u overflow, peak %u), '
+                                                           '%u checkouts, %u waits (%.2f s), %u timeouts.' % (
+                db_name, pool['checked_out'], config.Database.Pool.size, pool['overflow'], pool['peak_checked_out'],
+                pool['checkouts'], pool['waits'], pool['wait_seconds'], pool['timeouts']))
+
+        stats = DatabaseExecutor.get_stats()
+        for name, count, average, max_ in stats:
+            ChatManager.send_system_message(world_session, '%s: %u queries, %.2f ms avg, %.2f ms max.' % (
+                name, count, average, max_))
+        return 0, '%u queries shown.' % len(stats)
+
 
 PLAYER_COMMAND_DEFINITIONS = {
     'help': CommandManager.help
@@ -262,5 +286,7 @@ GM_COMMAND_DEFINITIONS = {
     'unmount': CommandManager.unmount,
     'morph': CommandManager.morph,
     'demorph': CommandManager.demorph,
-    'additem': CommandManager.additem
+    'additem': CommandManager.additem,
+    'reloaditems': CommandManager.reloaditems,
+    'dbstats': CommandManager.dbstats
 }
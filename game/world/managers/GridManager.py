@@ -1,11 +1,9 @@
-import math
-import threading
-
-from game.world.managers.abstractions.Vector import Vector
+from utils.ConfigManager import config
 from utils.constants.ObjectCodes import ObjectTypes
 
-TOLERANCE = 0.00001
 GRID_SIZE = 300
+# Cell coordinates are offset so negative ones can be packed in 16 bits (the world is well within +-32768 cells).
+CELL_OFFSET = 0x8000
 
 GRIDS = dict()
 
@@ -14,12 +12,11 @@ class GridManager(object):
 
     @staticmethod
     def add_or_get(worldobject, store=False):
-        min_x, min_y, max_x, max_y = GridManager.generate_coord_data(worldobject.location)
-        grid_coords = GridManager.get_grid_key(worldobject.location, worldobject.map_)
-        if grid_coords in GRIDS:
-            grid = GRIDS[grid_coords]
-        else:
-            grid = Grid(min_x, min_y, max_x, max_y, worldobject.map_)
+        cell_x, cell_y = GridManager.get_cell(worldobject.location)
+        grid_key = GridManager.get_grid_key_from_cell(cell_x, cell_y, worldobject.map_)
+        grid = GRIDS.get(grid_key)
+        if not grid:
+            grid = Grid(cell_x, cell_y, worldobject.map_)
             GRIDS[grid.key] = grid
 
         if store:
@@ -29,15 +26,15 @@ class GridManager(object):
 
     @staticmethod
     def update_object(worldobject):
-        grid_coords = GridManager.get_grid_key(worldobject.location, worldobject.map_)
+        grid_key = GridManager.get_grid_key(worldobject.location, worldobject.map_)
 
-        if grid_coords != worldobject.current_grid:
+        if grid_key != worldobject.current_grid:
             if worldobject.current_grid in GRIDS:
                 grid = GRIDS[worldobject.current_grid]
                 grid.remove(worldobject)
 
-            if grid_coords in GRIDS:
-                GRIDS[grid_coords].add(worldobject)
+            if grid_key in GRIDS:
+                GRIDS[grid_key].add(worldobject)
             else:
                 GridManager.add_or_get(worldobject, store=True)
 
@@ -48,43 +45,90 @@ class GridManager(object):
         if worldobject.current_grid in GRIDS:
             grid = GRIDS[worldobject.current_grid]
             grid.remove(worldobject)
-            grid.send_all_in_range(worldobject.get_destroy_packet(), source=worldobject, range_=GRID_SIZE)
+            # Players are destroyed for the ones that could see them by InterestManager.clear_visibility.
+            if worldobject.get_type() != ObjectTypes.TYPE_PLAYER:
+                GridManager.send_surrounding(worldobject.get_destroy_packet(), worldobject, include_self=False)
 
     @staticmethod
     def get_surrounding(worldobject, x_s=-1, x_m=1, y_s=-1, y_m=1):
-        vector = worldobject.location
-        near_grids = set()
+        cell_x, cell_y = GridManager.get_cell(worldobject.location)
+
+        if (x_s, x_m, y_s, y_m) == (-1, 1, -1, 1):
+            grid = GRIDS.get(GridManager.get_grid_key_from_cell(cell_x, cell_y, worldobject.map_))
+            if grid:
+                neighbor_keys = grid.neighbor_keys
+            else:
+                neighbor_keys = GridManager.get_neighbor_keys(cell_x, cell_y, worldobject.map_)
+        else:
+            neighbor_keys = GridManager.get_neighbor_keys(cell_x, cell_y, worldobject.map_, x_s, x_m, y_s, y_m)
 
-        for x in range(x_s, x_m + 1):
-            for y in range(y_s, y_m + 1):
-                grid_coords = GridManager.get_grid_key(
-                    Vector(vector.x + (x * GRID_SIZE), vector.y + (y * GRID_SIZE), 0),
-                    worldobject.map_)
-                if grid_coords in GRIDS:
-                    near_grids.add(GRIDS[grid_coords])
+        near_grids = []
+        for grid_key in neighbor_keys:
+            grid = GRIDS.get(grid_key)
+            if grid:
+                near_grids.append(grid)
 
         return near_grids
 
+    # Players only broadcast to the players that can see them (see InterestManager), other objects to their grids.
+    @staticmethod
+    def get_observers(worldobject, include_self=True):
+        observers = []
+        if worldobject.get_type() == ObjectTypes.TYPE_PLAYER:
+            if include_self and worldobject.session:
+                observers.append(worldobject)
+            observers.extend(player_mgr for player_mgr in list(worldobject.known_players.values())
+                             if player_mgr.is_online)
+        else:
+            for grid in GridManager.get_surrounding(worldobject):
+                observers.extend(player_mgr for player_mgr in list(grid.players.values())
+                                 if player_mgr.is_online and (include_self or player_mgr.guid != worldobject.guid))
+        return observers
+
     @staticmethod
     def send_surrounding(packet, worldobject, include_self=True):
-        for grid in GridManager.get_surrounding(worldobject):
-            grid.send_all(packet, source=None if include_self else worldobject)
+        for player_mgr in GridManager.get_observers(worldobject, include_self):
+            player_mgr.session.enqueue_packet(packet)
 
+    # The update block is batched with every other one each observer gets during this tick.
+    @staticmethod
+    def send_surrounding_update(update_block, worldobject, include_self=True):
+        for player_mgr in GridManager.get_observers(worldobject, include_self):
+            player_mgr.session.enqueue_update_block(update_block)
+
+    # Recipients are culled with squared distances and all of them get the same packet. A player's visibility set
+    # already holds everyone in range, unless the range goes past the update distance (yells), then the surrounding
+    # grids are searched instead.
     @staticmethod
     def send_surrounding_in_range(packet, worldobject, range_, include_self=True):
-        for grid in GridManager.get_surrounding(worldobject):
-            grid.send_all_in_range(packet, range_, worldobject, include_self)
+        if range_ <= 0:
+            GridManager.send_surrounding(packet, worldobject, include_self)
+            return
+
+        if worldobject.get_type() == ObjectTypes.TYPE_PLAYER and range_ <= config.World.Gameplay.update_dist:
+            if include_self and worldobject.session:
+                worldobject.session.enqueue_packet(packet)
+            players = list(worldobject.known_players.values())
+        else:
+            players = [player_mgr for player_mgr in GridManager.get_surrounding_players(worldobject).values()
+                       if include_self or player_mgr.guid != worldobject.guid]
+
+        range_sqrd = range_ * range_
+        location = worldobject.location
+        for player_mgr in players:
+            if player_mgr.is_online and location.distance_sqrd(player_mgr.location) <= range_sqrd:
+                player_mgr.session.enqueue_packet(packet)
 
     @staticmethod
     def get_surrounding_objects(worldobject, object_types):
         surrounding_objects = [{}, {}, {}]
         for grid in GridManager.get_surrounding(worldobject):
             if ObjectTypes.TYPE_PLAYER in object_types:
-                surrounding_objects.insert(0, grid.players)
+                surrounding_objects[0].update(grid.players)
             if ObjectTypes.TYPE_UNIT in object_types:
-                surrounding_objects.insert(1, grid.creatures)
+                surrounding_objects[1].update(grid.creatures)
             if ObjectTypes.TYPE_GAMEOBJECT in object_types:
-                surrounding_objects.insert(2, grid.gameobjects)
+                surrounding_objects[2].update(grid.gameobjects)
 
         return surrounding_objects
 
@@ -130,24 +174,23 @@ class GridManager(object):
         return None
 
     @staticmethod
-    def generate_coord_data(vector):
-        mod_x = vector.x / GRID_SIZE
-        mod_y = vector.y / GRID_SIZE
-
-        max_x = math.ceil(mod_x) * GRID_SIZE - TOLERANCE
-        max_y = math.ceil(mod_y) * GRID_SIZE - TOLERANCE
-        min_x = max_x - GRID_SIZE + TOLERANCE
-        min_y = max_y - GRID_SIZE + TOLERANCE
+    def get_cell(vector):
+        return int(vector.x // GRID_SIZE), int(vector.y // GRID_SIZE)
 
-        return min_x, min_y, max_x, max_y
+    # Packs (map, cell x, cell y) into a single integer.
+    @staticmethod
+    def get_grid_key_from_cell(cell_x, cell_y, map_):
+        return (int(map_) << 32) | ((cell_x + CELL_OFFSET) << 16) | (cell_y + CELL_OFFSET)
 
     @staticmethod
     def get_grid_key(vector, map_):
-        min_x, min_y, max_x, max_y = GridManager.generate_coord_data(vector)
-        key = '%u:%u:%u:%u%u' % (round(min_x, 5), round(min_y, 5), round(max_x, 5),
-                                 round(max_y, 5), map_)
+        cell_x, cell_y = GridManager.get_cell(vector)
+        return GridManager.get_grid_key_from_cell(cell_x, cell_y, map_)
 
-        return key
+    @staticmethod
+    def get_neighbor_keys(cell_x, cell_y, map_, x_s=-1, x_m=1, y_s=-1, y_m=1):
+        return tuple(GridManager.get_grid_key_from_cell(cell_x + x, cell_y + y, map_)
+                     for x in range(x_s, x_m + 1) for y in range(y_s, y_m + 1))
 
     @staticmethod
     def get_grids():
@@ -155,22 +198,22 @@ class GridManager(object):
 
 
 class Grid(object):
-    def __init__(self, min_x=0.0, min_y=0.0, max_x=0.0, max_y=0.0, map_=0.0, zones=None, gameobjects=None,
-                 creatures=None, players=None, key=''):
-        self.min_x = min_x
-        self.min_y = min_y
-        self.max_x = max_x
-        self.max_y = max_y
+    def __init__(self, cell_x=0, cell_y=0, map_=0, zones=None, gameobjects=None, creatures=None, players=None):
+        self.cell_x = cell_x
+        self.cell_y = cell_y
+        self.min_x = cell_x * GRID_SIZE
+        self.min_y = cell_y * GRID_SIZE
+        self.max_x = self.min_x + GRID_SIZE
+        self.max_y = self.min_y + GRID_SIZE
         self.map_ = map_
         self.zones = zones
-        self.key = key
         self.gameobjects = gameobjects
         self.creatures = creatures
         self.players = players
 
-        if not key:
-            self.key = '%u:%u:%u:%u%u' % (round(self.min_x, 5), round(self.min_y, 5), round(self.max_x, 5),
-                                          round(self.max_y, 5), self.map_)
+        self.key = GridManager.get_grid_key_from_cell(cell_x, cell_y, map_)
+        # This grid and its 8 neighbors, they never change so they are only computed once.
+        self.neighbor_keys = GridManager.get_neighbor_keys(cell_x, cell_y, map_)
 
         if not gameobjects:
             self.gameobjects = dict()
@@ -187,9 +230,8 @@ class Grid(object):
             vector = worldobject.location
             map_ = worldobject.map_
 
-        if vector and map_:
-            return self.min_x <= round(vector.x, 5) <= self.max_x and self.min_y <= round(vector.y, 5) <= self.max_y \
-                   and map_ == self.map_
+        if vector and map_ is not None:
+            return GridManager.get_grid_key(vector, map_) == self.key
         return False
 
     def add(self, worldobject):
@@ -216,14 +258,15 @@ class Grid(object):
             if player_mgr.is_online:
                 if source and player_mgr.guid == source.guid:
                     continue
-                threading.Thread(target=player_mgr.session.request.sendall, args=(packet,)).start()
+                player_mgr.session.enqueue_packet(packet)
 
     def send_all_in_range(self, packet, range_, source, include_self=True):
         if range_ <= 0:
             self.send_all(packet, source)
         else:
+            range_sqrd = range_ * range_
             for guid, player_mgr in list(self.players.items()):
-                if player_mgr.is_online and player_mgr.location.distance(source.location) <= range_:
+                if player_mgr.is_online and player_mgr.location.distance_sqrd(source.location) <= range_sqrd:
                     if not include_self and player_mgr.guid == source.guid:
                         continue
-                    threading.Thread(target=player_mgr.session.request.sendall, args=(packet,)).start()
+                    player_mgr.session.enqueue_packet(packet)
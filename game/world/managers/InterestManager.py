@@ -0,0 +1,89 @@
+import threading
+
+from game.world.managers.GridManager import GridManager
+from game.world.opcode_handling.handlers.NameQueryHandler import NameQueryHandler
+from network.packet.PacketWriter import *
+from utils.ConfigManager import config
+from utils.constants.ObjectCodes import UpdateTypes
+
+# Visibility sets are changed from the world tick and from session threads (login, logout, teleport).
+VISIBILITY_LOCK = threading.RLock()
+
+
+class InterestManager(object):
+    # Keeps track of which players can see each other (player_mgr.known_players). Visibility is symmetric, every
+    # player uses the same update distance, so a single set per player is both what it sees and who observes it.
+    # Only differences are sent: create blocks for players coming into range and destroys for the ones leaving it.
+
+    @staticmethod
+    def update_visibility(player_mgr):
+        with VISIBILITY_LOCK:
+            if not player_mgr.is_online or not player_mgr.session:
+                return
+
+            update_dist_sqrd = config.World.Gameplay.update_dist ** 2
+            visible_players = dict()
+            for guid, player in GridManager.get_surrounding_players(player_mgr).items():
+                if guid != player_mgr.guid and player.is_online and player.map_ == player_mgr.map_ and \
+                        player_mgr.location.distance_sqrd(player.location) <= update_dist_sqrd:
+                    visible_players[guid] = player
+
+            known_players = player_mgr.known_players
+            for guid in [guid for guid in known_players if guid not in visible_players]:
+                InterestManager._forget(player_mgr, known_players[guid])
+
+            entered_players = [player for guid, player in visible_players.items() if guid not in known_players]
+            if not entered_players:
+                return
+
+            # Built only once, no matter how many players see this one appearing.
+            create_blocks, query_packets = InterestManager._get_create_packets(player_mgr)
+
+            entered_query_packets = []
+            for player in entered_players:
+                known_players[player.guid] = player
+                player.known_players[player_mgr.guid] = player_mgr
+
+                player_create_blocks, player_query_packets = InterestManager._get_create_packets(player)
+                for update_block in player_create_blocks:
+                    player_mgr.session.enqueue_update_block(update_block)
+                entered_query_packets.extend(player_query_packets)
+
+                if player.session:
+                    for update_block in create_blocks:
+                        player.session.enqueue_update_block(update_block)
+                    for packet in query_packets:
+                        player.session.enqueue_packet(packet)
+
+            # Queries after every create block, so all of them go in a single update packet.
+            for packet in entered_query_packets:
+                player_mgr.session.enqueue_packet(packet)
+
+    # Makes the player and everyone it could see forget about each other (logout, teleport). A client logging out
+    # doesn't need the destroys of the players it could see.
+    @staticmethod
+    def clear_visibility(player_mgr, notify_self=True):
+        with VISIBILITY_LOCK:
+            for player in list(player_mgr.known_players.values()):
+                InterestManager._forget(player_mgr, player, notify_self)
+
+    # Create blocks of the player and its items (items first, the player's inventory fields point to them), then the
+    # name and item queries, for a client seeing the player for the first time.
+    @staticmethod
+    def _get_create_packets(player_mgr):
+        items = player_mgr.inventory.get_inventory_items()
+        update_blocks = [item.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=False) for item in items]
+        update_blocks.append(player_mgr.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=False))
+        query_packets = [NameQueryHandler.get_query_details(player_mgr.player)]
+        query_packets.extend([item.query_details() for item in items])
+        return update_blocks, query_packets
+
+    @staticmethod
+    def _forget(player_mgr, player, notify_self=True):
+        player_mgr.known_players.pop(player.guid, None)
+        player.known_players.pop(player_mgr.guid, None)
+
+        if notify_self and player_mgr.session:
+            player_mgr.session.enqueue_packet(player.get_destroy_packet())
+        if player.session:
+            player.session.enqueue_packet(player_mgr.get_destroy_packet())
@@ -0,0 +1,110 @@
+import threading
+from concurrent.futures import Future
+
+from database.realm.RealmDatabaseManager import RealmDatabaseManager
+from game.world.WorldScheduler import WorldScheduler
+from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from utils.ConfigManager import config
+from utils.Logger import Logger
+
+# character guid -> {column: value}, only what changed since the last flush.
+DIRTY_CHARACTERS = dict()
+DIRTY_LOCK = threading.Lock()
+# character guid -> Future resolved once its logout save is written, loading the character again waits on it.
+PENDING_SAVES = dict()
+# Held while writing, so an older batch can never land after a newer one and wait_for_save knows none is in flight.
+FLUSH_LOCK = threading.Lock()
+
+
+class PersistenceManager(object):
+    # Write-behind saving of characters. Players are synced by a world scheduler job every
+    # realm_saving_interval_seconds, only the columns that actually changed are queued, and a single worker thread
+    # writes all of them in one batch.
+    # Idle players cost nothing, and no save is ever more than one interval old.
+
+    worker_event = threading.Event()
+
+    @staticmethod
+    def start():
+        WorldScheduler.add_job(PersistenceManager.sync_players, config.Server.Settings.realm_saving_interval_seconds)
+
+        worker_thread = threading.Thread(target=PersistenceManager.run)
+        worker_thread.daemon = True
+        worker_thread.start()
+
+    @staticmethod
+    def mark_dirty(guid, changes):
+        with DIRTY_LOCK:
+            DIRTY_CHARACTERS.setdefault(guid, dict()).update(changes)
+
+    @staticmethod
+    def sync_players():
+        for session in WorldSessionStateHandler.get_world_sessions():
+            player_mgr = session.player_mgr
+            if player_mgr and player_mgr.is_online:
+                player_mgr.sync_player()
+
+        if DIRTY_CHARACTERS:
+            PersistenceManager.worker_event.set()
+
+    # Final save of a character (logout). Never blocks, the worker writes it right away, and wait_for_save() lets
+    # whoever loads the character again (relog) read it only once it's written.
+    @staticmethod
+    def save_character(player_mgr):
+        player_mgr.sync_player()
+        with DIRTY_LOCK:
+            if player_mgr.guid not in DIRTY_CHARACTERS:
+                return
+            if player_mgr.guid not in PENDING_SAVES:
+                PENDING_SAVES[player_mgr.guid] = Future()
+        PersistenceManager.worker_event.set()
+
+    # Blocks until the logout save of the character (if any) is written, only call it from database workers.
+    # Returns True if there was one.
+    @staticmethod
+    def wait_for_save(guid):
+        with DIRTY_LOCK:
+            pending_save = PENDING_SAVES.get(guid)
+        if pending_save:
+            pending_save.result()
+        # A batch with the character in it may still be being written.
+        with FLUSH_LOCK:
+            pass
+        return pending_save is not None
+
+    @staticmethod
+    def flush():
+        with FLUSH_LOCK:
+            with DIRTY_LOCK:
+                if not DIRTY_CHARACTERS:
+                    return
+                dirty_characters = dict(DIRTY_CHARACTERS)
+                DIRTY_CHARACTERS.clear()
+                pending_saves = [PENDING_SAVES.pop(guid) for guid in dirty_characters if guid in PENDING_SAVES]
+            saved = PersistenceManager._write(dirty_characters)
+
+        # Even if it failed, the character is loaded with whatever is in the database rather than waiting forever.
+        for pending_save in pending_saves:
+            pending_save.set_result(saved)
+
+    @staticmethod
+    def _write(dirty_characters):
+        try:
+            RealmDatabaseManager.character_bulk_update(
+                [dict(changes, guid=guid) for guid, changes in dirty_characters.items()])
+            Logger.debug('Saved %u characters.' % len(dirty_characters))
+            return True
+        except Exception as e:
+            Logger.error('Error saving %u characters: %s' % (len(dirty_characters), e))
+            # Put them back unless they changed meanwhile, they will be retried with the next batch.
+            with DIRTY_LOCK:
+                for guid, changes in dirty_characters.items():
+                    DIRTY_CHARACTERS[guid] = dict(changes, **DIRTY_CHARACTERS.get(guid, {}))
+            return False
+
+    @staticmethod
+    def run():
+        while True:
+            PersistenceManager.worker_event.wait()
+            PersistenceManager.worker_event.clear()
+            PersistenceManager.flush()
@@ -0,0 +1,129 @@
+import threading
+import time
+
+from database.world.WorldDatabaseManager import WorldDatabaseManager
+from utils.ConfigManager import config
+
+# Online players indexed by everything /who can filter on, so a query only looks at matching players.
+# guid -> (player_mgr, level, race, class, zone)
+WHO_PLAYERS = dict()
+# bucket key -> set of guids. Zones are the ones the player's area belongs to, None if the area is unknown.
+WHO_BY_LEVEL = dict()
+WHO_BY_RACE = dict()
+WHO_BY_CLASS = dict()
+WHO_BY_ZONE = dict()
+WHO_LOCK = threading.RLock()
+# normalized query -> (expire time, population version, SMSG_WHO packet)
+WHO_RESPONSES = dict()
+# Expired responses are only cleaned up once there are more than this many.
+MAX_WHO_RESPONSES = 256
+
+ALL_MASK = 0xFFFFFFFF
+
+
+class WhoManager(object):
+    # Bumped every time the index changes, cached responses built for an older population are never sent.
+    population_version = 0
+
+    @staticmethod
+    def add_player(player_mgr):
+        with WHO_LOCK:
+            WhoManager.remove_player(player_mgr)
+
+            entry = (player_mgr,
+                     player_mgr.level,
+                     player_mgr.player.race,
+                     player_mgr.player.class_,
+                     WorldDatabaseManager.area_get_zone_id(player_mgr.zone))
+            WHO_PLAYERS[player_mgr.guid] = entry
+            WhoManager.population_version += 1
+            for buckets, key in WhoManager._get_bucket_keys(entry):
+                buckets.setdefault(key, set()).add(player_mgr.guid)
+
+    @staticmethod
+    def remove_player(player_mgr):
+        with WHO_LOCK:
+            entry = WHO_PLAYERS.pop(player_mgr.guid, None)
+            if entry:
+                WhoManager.population_version += 1
+                for buckets, key in WhoManager._get_bucket_keys(entry):
+                    bucket = buckets[key]
+                    bucket.discard(player_mgr.guid)
+                    if not bucket:
+                        del buckets[key]
+
+    # Must be called whenever the level or zone of an online player changes.
+    @staticmethod
+    def update_player(player_mgr):
+        with WHO_LOCK:
+            entry = WHO_PLAYERS.get(player_mgr.guid)
+            if entry and (entry[1] != player_mgr.level or
+                          entry[4] != WorldDatabaseManager.area_get_zone_id(player_mgr.zone)):
+                WhoManager.add_player(player_mgr)
+
+    @staticmethod
+    def get_online_count():
+        return len(WHO_PLAYERS)
+
+    # Players matching the level range, race and class masks and zones. Every filter narrows the candidates down to
+    # the union of its buckets, and only the smallest of those sets is walked.
+    @staticmethod
+    def find_players(level_min, level_max, race_mask=ALL_MASK, class_mask=ALL_MASK, zones=None):
+        with WHO_LOCK:
+            candidates = []
+            candidates.append(WhoManager._union(WHO_BY_LEVEL, [level for level in WHO_BY_LEVEL
+                                                               if level_min <= level <= level_max]))
+            if race_mask != ALL_MASK:
+                candidates.append(WhoManager._union(WHO_BY_RACE, [race for race in WHO_BY_RACE
+                                                                  if race_mask & (1 << race)]))
+            if class_mask != ALL_MASK:
+                candidates.append(WhoManager._union(WHO_BY_CLASS, [class_ for class_ in WHO_BY_CLASS
+                                                                   if class_mask & (1 << class_)]))
+            if zones:
+                # Players in unknown areas are never filtered out by zone.
+                candidates.append(WhoManager._union(WHO_BY_ZONE, list(zones) + [None]))
+
+            candidates.sort(key=len)
+            guids = candidates[0]
+            for other_guids in candidates[1:]:
+                guids = guids & other_guids
+
+            return [WHO_PLAYERS[guid][0] for guid in sorted(guids)]
+
+    # Identical queries (mostly the default one sent by the social panel) share the same response for a few seconds.
+    @staticmethod
+    def get_cached_response(query):
+        with WHO_LOCK:
+            response = WHO_RESPONSES.get(query)
+            if response and response[0] > time.monotonic() and response[1] == WhoManager.population_version:
+                return response[2]
+        return None
+
+    # population_version must be read before looking for the players, so a response built while players were logging
+    # in or out is never cached as up to date.
+    @staticmethod
+    def cache_response(query, population_version, packet):
+        now = time.monotonic()
+        with WHO_LOCK:
+            if len(WHO_RESPONSES) >= MAX_WHO_RESPONSES:
+                for expired_query in [query_ for query_, response in WHO_RESPONSES.items()
+                                      if response[0] <= now or response[1] != WhoManager.population_version]:
+                    del WHO_RESPONSES[expired_query]
+                if len(WHO_RESPONSES) >= MAX_WHO_RESPONSES:
+                    WHO_RESPONSES.clear()
+
+            WHO_RESPONSES[query] = (now + config.Server.Settings.who_cache_ttl_seconds,
+                                    population_version,
+                                    packet)
+
+    @staticmethod
+    def _union(buckets, keys):
+        guids = set()
+        for key in keys:
+            guids.update(buckets.get(key, ()))
+        return guids
+
+    @staticmethod
+    def _get_bucket_keys(entry):
+        player_mgr, level, race, class_, zone = entry
+        return (WHO_BY_LEVEL, level), (WHO_BY_RACE, race), (WHO_BY_CLASS, class_), (WHO_BY_ZONE, zone)
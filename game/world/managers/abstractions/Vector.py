@@ -22,7 +22,7 @@ class Vector(object):
         d_y = self.y - vector.y
         d_z = self.z - vector.z
 
-        return math.pow(d_x, 2) + math.pow(d_y, 2) + math.pow(d_z, 2)
+        return d_x * d_x + d_y * d_y + d_z * d_z
 
     def angle(self, vector=None, x=0, y=0):
         if not vector:
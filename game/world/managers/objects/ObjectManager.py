@@ -55,7 +55,7 @@ class ObjectManager(object):
         self.zone = zone
         self.map_ = map_
 
-        self.current_grid = ''
+        self.current_grid = None
         self.last_tick = 0
 
     def get_object_type_value(self):
@@ -81,26 +81,28 @@ class ObjectManager(object):
 
         return (mask + 31) / 32
 
+    # Returns None if no field changed since the last partial update.
     def create_partial_update_packet(self, update_packet_factory):
+        if not update_packet_factory.has_updated_fields():
+            return None
+
         update_mask = self.get_update_mask()
         updated_fields_mask = update_packet_factory.get_updated_fields_mask()
         data = pack(
-            '<IBQI%us' % len(updated_fields_mask),
-            1,  # Number of transactions
-            0,
+            '<BQB%us' % len(updated_fields_mask),
+            UpdateTypes.UPDATE_PARTIAL,
             self.guid,
             int(update_mask),
             updated_fields_mask
         )
-        return data
+        return data + update_packet_factory.build_partial_packet()
 
     def create_update_packet(self, is_self=True):
         from game.world.managers.objects import UnitManager
         update_mask = self.get_update_mask()
         data = pack(
-            '<IBQBQfffffffffIIffffIIIQB',
-            1,  # Number of transactions
-            2,
+            '<BQBQfffffffffIIffffIIIQB',
+            UpdateTypes.UPDATE_FULL,
             self.guid,
             self.get_type_id(),
             self.transport_id,
@@ -126,15 +128,14 @@ class ObjectManager(object):
             int(update_mask)
         )
 
-        for x in range(0, int(update_mask)):
-            data += pack('<I', 0xFFFFFFFF)
-
-        return data
+        # Every field is sent in create blocks.
+        return data + b'\xff\xff\xff\xff' * int(update_mask)
 
     # override
     def update(self):
         pass
 
+    # Returns a single update block (transaction), see UpdatePacketFactory.get_update_object_packet.
     # override
     def get_update_packet(self, update_type=UpdateTypes.UPDATE_FULL, is_self=True):
         pass
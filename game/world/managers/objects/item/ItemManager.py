@@ -289,14 +289,10 @@ class ItemManager(ObjectManager):
                                                       ContainerFields.CONTAINER_FIELD_SLOT_1 + x * 2,
                                                       guid, 'Q')
 
-            packet = b''
             if update_type == UpdateTypes.UPDATE_FULL:
-                packet += self.create_update_packet(is_self)
+                return self.create_update_packet(is_self) + self.update_packet_factory.build_packet()
             else:
-                packet += self.create_partial_update_packet(self.update_packet_factory)
-
-            update_packet = packet + self.update_packet_factory.build_packet()
-            return update_packet
+                return self.create_partial_update_packet(self.update_packet_factory)
 
     # override
     def get_type(self):
@@ -18,38 +18,42 @@ class InventoryManager(object):
         self.containers = dict()
         self.owner = owner
 
-    def load_items(self):
+    # item_templates is {entry: template}, read along with the inventory when it's not given.
+    def load_items(self, character_inventory=None, item_templates=None):
         # Add backpack
         self.containers[InventorySlots.SLOT_INBACKPACK] = ContainerManager(is_backpack=True,
                                                                            owner=self.owner.guid)
 
-        character_inventory = RealmDatabaseManager.character_get_inventory(self.owner.guid)
+        if character_inventory is None:
+            character_inventory = RealmDatabaseManager.character_get_inventory(self.owner.guid)
+        if item_templates is None:
+            item_templates = WorldDatabaseManager.item_template_get_by_entries(
+                [item_instance.item_template for item_instance in character_inventory])
 
-        # First load bags
+        # Bags are added as they come, items are placed once every bag exists
+        items = []
         for item_instance in character_inventory:
-            item_template = WorldDatabaseManager.item_template_get_by_entry(item_instance.item_template)
-            if item_template and item_template.inventory_type == InventoryTypes.BAG:
+            item_template = item_templates.get(item_instance.item_template)
+            if not item_template:
+                continue
+
+            if item_template.inventory_type == InventoryTypes.BAG and self.is_bag_pos(item_instance.slot):
                 container_mgr = ContainerManager(
                     owner=self.owner.guid,
                     item_template=item_template,
                     item_instance=item_instance
                 )
-                if self.is_bag_pos(container_mgr.current_slot):
-                    self.containers[item_instance.bag].sorted_slots[container_mgr.current_slot] = container_mgr
-                    self.containers[container_mgr.current_slot] = container_mgr
-
-        # Then load items
-        for item_instance in character_inventory:
-            item_template = WorldDatabaseManager.item_template_get_by_entry(item_instance.item_template)
-            if item_template:
-                item_mgr = ItemManager(
+                self.containers[item_instance.bag].sorted_slots[container_mgr.current_slot] = container_mgr
+                self.containers[container_mgr.current_slot] = container_mgr
+            else:
+                items.append(ItemManager(
                     item_template=item_template,
                     item_instance=item_instance
-                )
-                if item_mgr.is_container() and self.is_bag_pos(item_mgr.current_slot):
-                    continue
-                if item_instance.bag in self.containers:
-                    self.containers[item_instance.bag].sorted_slots[item_mgr.current_slot] = item_mgr
+                ))
+
+        for item_mgr in items:
+            if item_mgr.item_instance.bag in self.containers:
+                self.containers[item_mgr.item_instance.bag].sorted_slots[item_mgr.current_slot] = item_mgr
 
         self.set_base_attack_time()
 
@@ -67,9 +71,8 @@ class InventoryManager(object):
                     if not container.is_full():
                         item_mgr = container.add_item(item_template)
                         if item_mgr:
-                            self.owner.session.request.sendall(PacketWriter.get_packet(
-                                OpCode.SMSG_UPDATE_OBJECT,
-                                self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True)))
+                            self.owner.session.enqueue_update_block(
+                                self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True))
                             return item_mgr
         return None
 
@@ -149,9 +152,8 @@ class InventoryManager(object):
                     source_item.item_instance.stackcount -= diff
                     dest_item.item_instance.stackcount = dest_item.item_template.stackable
 
-                self.owner.session.request.sendall(PacketWriter.get_packet(
-                    OpCode.SMSG_UPDATE_OBJECT,
-                    self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True)))
+                self.owner.session.enqueue_update_block(
+                    self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True))
                 return
 
             # Actual transfer
@@ -196,9 +198,8 @@ class InventoryManager(object):
                     dest_slot == InventorySlots.SLOT_MAINHAND:
                 self.set_base_attack_time()
 
-            self.owner.session.request.sendall(PacketWriter.get_packet(
-                OpCode.SMSG_UPDATE_OBJECT,
-                self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True)))
+            self.owner.session.enqueue_update_block(
+                self.owner.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True))
 
     def set_base_attack_time(self):
         if InventorySlots.SLOT_MAINHAND in self.get_backpack().sorted_slots:
@@ -308,30 +309,43 @@ class InventoryManager(object):
                 item_2.guid if item_2 else self.owner.guid,
                 0
             )
-        self.owner.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_INVENTORY_CHANGE_FAILURE, data))
+        self.owner.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_INVENTORY_CHANGE_FAILURE, data))
 
     def build_update(self, update_packet_factory):
-        for slot, item in self.get_backpack().sorted_slots.items():
+        # Every slot is written, field values are kept between updates so emptied slots have to be cleared.
+        sorted_slots = self.get_backpack().sorted_slots
+        for slot in range(InventorySlots.SLOT_BANK_END):
+            item = sorted_slots.get(slot)
             update_packet_factory.update(update_packet_factory.player_values,
                                          update_packet_factory.updated_player_fields,
-                                         PlayerFields.PLAYER_FIELD_INV_SLOT_1 + item.current_slot * 2, item.guid, 'Q')
+                                         PlayerFields.PLAYER_FIELD_INV_SLOT_1 + slot * 2, item.guid if item else 0, 'Q')
 
     def send_single_item_update(self, world_session, item, is_self):
-        update_packet = UpdatePacketFactory.compress_if_needed(PacketWriter.get_packet(
-            OpCode.SMSG_UPDATE_OBJECT, item.get_update_packet(update_type=UpdateTypes.UPDATE_FULL,
-                                                              is_self=False)))
-        if is_self:
-            world_session.request.sendall(update_packet)
-            world_session.request.sendall(item.query_details())
-        else:
-            GridManager.send_surrounding(update_packet, world_session.player_mgr, include_self=False)
-            GridManager.send_surrounding(item.query_details(), world_session.player_mgr,
-                                         include_self=False)
+        self.send_items_update(world_session, [item], is_self)
 
     def send_inventory_update(self, world_session, is_self=True):
+        self.send_items_update(world_session, self.get_inventory_items(), is_self)
+
+    # Bags and every item in them, backpack included.
+    def get_inventory_items(self):
+        items = []
         for container_slot, container in list(self.containers.items()):
             if not container.is_backpack:
-                self.send_single_item_update(world_session, container, is_self)
-
-            for slot, item in list(container.sorted_slots.items()):
-                self.send_single_item_update(world_session, item, is_self)
+                items.append(container)
+            items.extend(list(container.sorted_slots.values()))
+        return items
+
+    # Create blocks go first, so the whole inventory is batched into a single update packet. Item queries follow.
+    def send_items_update(self, world_session, items, is_self):
+        for item in items:
+            update_block = item.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=False)
+            if is_self:
+                world_session.enqueue_update_block(update_block)
+            else:
+                GridManager.send_surrounding_update(update_block, world_session.player_mgr, include_self=False)
+
+        for item in items:
+            if is_self:
+                world_session.enqueue_packet(item.query_details())
+            else:
+                GridManager.send_surrounding(item.query_details(), world_session.player_mgr, include_self=False)
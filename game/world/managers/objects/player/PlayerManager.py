@@ -3,7 +3,12 @@ from struct import unpack
 from math import pi
 
 from database.world.WorldDatabaseManager import WorldDatabaseManager
-from game.world.managers.GridManager import GridManager, GRIDS
+from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from game.world.managers.GridManager import GridManager
+from game.world.managers.ChannelManager import ChannelManager
+from game.world.managers.InterestManager import InterestManager
+from game.world.managers.PersistenceManager import PersistenceManager
+from game.world.managers.WhoManager import WhoManager
 from game.world.managers.objects.UnitManager import UnitManager
 from game.world.managers.objects.player.GuildManager import GuildManager
 from game.world.managers.objects.player.InventoryManager import InventoryManager
@@ -49,6 +54,11 @@ class PlayerManager(UnitManager):
                                                           ObjectTypes.TYPE_PLAYER])
         self.session = session
         self.flagged_for_update = False
+        self.flagged_for_visibility_update = False
+        self.known_players = dict()
+        self.channels = dict()
+        # (totaltime, leveltime) last queued to be saved, update() adds the elapsed time straight to the character row.
+        self.saved_played_time = None
 
         self.player = player
         self.is_online = is_online
@@ -161,12 +171,21 @@ class PlayerManager(UnitManager):
 
     def complete_login(self):
         self.is_online = True
+        WorldSessionStateHandler.add_player(self.session)
+        WhoManager.add_player(self)
+        # The player just received its full create block, and everyone else will get one when they first see it.
+        self.update_packet_factory.reset_updated_fields()
+        self.session.enqueue_packet(NameQueryHandler.get_query_details(self.player))
         GridManager.update_object(self)
         self.update_surrounding()
 
     def logout(self):
-        self.session.save_character()
+        PersistenceManager.save_character(self)
         GridManager.remove_object(self)
+        InterestManager.clear_visibility(self, notify_self=False)
+        WorldSessionStateHandler.remove_player(self.session)
+        WhoManager.remove_player(self)
+        ChannelManager.leave_all(self)
         self.session.player_mgr = None
         self.session = None
         self.is_online = False
@@ -189,48 +208,43 @@ class PlayerManager(UnitManager):
             data += pack('<I', 0)  # TODO: Handle action buttons later
         return PacketWriter.get_packet(OpCode.SMSG_ACTION_BUTTONS, data)
 
-    def update_surrounding(self, destroy=False):
-        if destroy:
-            grid = GRIDS[self.current_grid]
-
-            for guid, player in list(grid.players.items()):
-                if player.guid != self.guid:
-                    self.session.request.sendall(player.get_destroy_packet())
-
-        update_packet = UpdatePacketFactory.compress_if_needed(PacketWriter.get_packet(
-            OpCode.SMSG_UPDATE_OBJECT, self.get_update_packet(update_type=UpdateTypes.UPDATE_FULL,
-                                                              is_self=False)))
-        GridManager.send_surrounding(update_packet, self, include_self=False)
-        GridManager.send_surrounding(NameQueryHandler.get_query_details(self.player), self, include_self=True)
-
-        for guid, player in list(GridManager.get_surrounding_players(self).items()):
-            if self.guid != guid:
-                self.session.request.sendall(
-                    PacketWriter.get_packet(OpCode.SMSG_UPDATE_OBJECT,
-                                            player.get_update_packet(update_type=UpdateTypes.UPDATE_FULL,
-                                                                     is_self=False)))
-                self.session.request.sendall(NameQueryHandler.get_query_details(player.player))
+    # Visibility is recomputed on the next world tick, once no matter how many times the player moved meanwhile.
+    def update_surrounding(self):
+        self.flagged_for_visibility_update = True
 
+    # Copies the player state into its character row, whatever changed is queued to be saved.
     def sync_player(self):
         if self.player and self.player.guid == self.guid:
-            self.player.level = self.level
-            self.player.xp = self.xp
-            self.player.talent_points = self.talent_points
-            self.player.skillpoints = self.skill_points
-            self.player.position_x = self.location.x
-            self.player.position_y = self.location.y
-            self.player.position_z = self.location.z
-            self.player.map = self.map_
-            self.player.orientation = self.location.o
-            self.player.zone = self.zone
-            self.player.health = self.health
-            self.player.power1 = self.power_1
-            self.player.power2 = self.power_2
-            self.player.power3 = self.power_3
-            self.player.power4 = self.power_4
+            changes = dict()
+            for column, value in (('level', self.level),
+                                  ('xp', self.xp),
+                                  ('talentpoints', self.talent_points),
+                                  ('skillpoints', self.skill_points),
+                                  ('position_x', self.location.x),
+                                  ('position_y', self.location.y),
+                                  ('position_z', self.location.z),
+                                  ('map', self.map_),
+                                  ('orientation', self.location.o),
+                                  ('zone', self.zone),
+                                  ('health', self.health),
+                                  ('power1', self.power_1),
+                                  ('power2', self.power_2),
+                                  ('power3', self.power_3),
+                                  ('power4', self.power_4)):
+                if getattr(self.player, column) != value:
+                    setattr(self.player, column, value)
+                    changes[column] = value
+
+            played_time = (int(self.player.totaltime), int(self.player.leveltime))
+            if played_time != self.saved_played_time:
+                changes['totaltime'], changes['leveltime'] = played_time
+                self.saved_played_time = played_time
+
+            if changes:
+                PersistenceManager.mark_dirty(self.guid, changes)
 
     def teleport(self, map_, location):
-        GridManager.send_surrounding(self.get_destroy_packet(), self, include_self=False)
+        InterestManager.clear_visibility(self)
 
         # Same map and not inside instance
         if self.map_ == map_ and self.map_ <= 1:
@@ -248,11 +262,11 @@ class PlayerManager(UnitManager):
                 0,  # ?
                 0  # MovementFlags
             )
-            self.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_MOVE_WORLDPORT_ACK, data))
+            self.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_MOVE_WORLDPORT_ACK, data))
         # Loading screen
         else:
             data = pack('<I', map_)
-            self.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_TRANSFER_PENDING, data))
+            self.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_TRANSFER_PENDING, data))
 
             data = pack(
                 '<B4f',
@@ -263,7 +277,7 @@ class PlayerManager(UnitManager):
                 location.o
             )
 
-            self.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_NEW_WORLD, data))
+            self.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_NEW_WORLD, data))
 
         self.map_ = map_
         self.location.x = location.x
@@ -312,7 +326,7 @@ class PlayerManager(UnitManager):
             speed = 56  # Max speed without glitches
         self.running_speed = speed
         data = pack('<f', speed)
-        self.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_FORCE_SPEED_CHANGE, data))
+        self.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_FORCE_SPEED_CHANGE, data))
 
     def change_swim_speed(self, swim_speed=0):
         if swim_speed <= 0:
@@ -321,7 +335,7 @@ class PlayerManager(UnitManager):
             swim_speed = 56  # Max possible swim speed
         self.swim_speed = swim_speed
         data = pack('<f', swim_speed)
-        self.session.request.sendall(PacketWriter.get_packet(OpCode.SMSG_FORCE_SWIM_SPEED_CHANGE, data))
+        self.session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_FORCE_SWIM_SPEED_CHANGE, data))
 
     def change_walk_speed(self, walk_speed=0):
         if walk_speed <= 0:
@@ -330,7 +344,7 @@ class PlayerManager(UnitManager):
             walk_speed = 56  # Max speed without glitches
         self.swim_speed = walk_speed
         data = pack('<f', walk_speed)
-        self.session.request.sendall(PacketWriter.get_packet(OpCode.MSG_MOVE_SET_WALK_SPEED, data))
+        self.session.enqueue_packet(PacketWriter.get_packet(OpCode.MSG_MOVE_SET_WALK_SPEED, data))
 
     def change_turn_speed(self, turn_speed=0):
         if turn_speed <= 0:
@@ -338,25 +352,28 @@ class PlayerManager(UnitManager):
         self.turn_rate = turn_speed
         data = pack('<f', turn_speed)
         # TODO NOT WORKING
-        self.session.request.sendall(PacketWriter.get_packet(OpCode.MSG_MOVE_SET_TURN_RATE_CHEAT, data))
+        self.session.enqueue_packet(PacketWriter.get_packet(OpCode.MSG_MOVE_SET_TURN_RATE_CHEAT, data))
 
-    def load_skills(self):
-        for skill in WorldDatabaseManager.player_create_skill_get(self.player.race,
-                                                                  self.player.class_):
+    def load_skills(self, create_skills=None):
+        if create_skills is None:
+            create_skills = WorldDatabaseManager.player_create_skill_get(self.player.race, self.player.class_)
+        for skill in create_skills:
             skill_to_add = DbcDatabaseManager.skill_get_by_id(skill.Skill)
             self.skills.append(skill_to_add)
 
-    def load_spells(self):
-        for spell in WorldDatabaseManager.player_create_spell_get(self.player.race,
-                                                                  self.player.class_):
+    def load_spells(self, create_spells=None):
+        if create_spells is None:
+            create_spells = WorldDatabaseManager.player_create_spell_get(self.player.race, self.player.class_)
+        for spell in create_spells:
             spell_to_load = DbcDatabaseManager.spell_get_by_id(spell.Spell)
             if spell_to_load:
                 self.spells.append(spell_to_load)
 
-    # TODO: UPDATE_PARTIAL is not being used anywhere (it's implemented but not sure if it works correctly).
     # override
     def get_update_packet(self, update_type=UpdateTypes.UPDATE_FULL, is_self=True):
-        self.inventory.send_inventory_update(self.session, is_self)
+        # Other players get the item create blocks from InterestManager, only the ones seeing this player appear.
+        if update_type == UpdateTypes.UPDATE_FULL and is_self:
+            self.inventory.send_inventory_update(self.session, is_self)
 
         self.bytes_1 = unpack('<I', pack('<4B', self.stand_state, 0, self.shapeshift_form, self.sheath_state))[0]
         self.bytes_2 = unpack('<I', pack('<4B', self.combo_points, 0, 0, 0))[0]
@@ -441,14 +458,10 @@ class PlayerManager(UnitManager):
 
         self.inventory.build_update(self.update_packet_factory)
 
-        packet = b''
         if update_type == UpdateTypes.UPDATE_FULL:
-            packet += self.create_update_packet(is_self)
+            return self.create_update_packet(is_self) + self.update_packet_factory.build_packet()
         else:
-            packet += self.create_partial_update_packet(self.update_packet_factory)
-
-        update_packet = packet + self.update_packet_factory.build_packet()
-        return update_packet
+            return self.create_partial_update_packet(self.update_packet_factory)
 
     # override
     def update(self):
@@ -461,18 +474,19 @@ class PlayerManager(UnitManager):
         self.last_tick = now
 
         if self.flagged_for_update:
-            self.session.request.sendall(PacketWriter.get_packet(
-                OpCode.SMSG_UPDATE_OBJECT,
-                self.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=True)))
+            # Cleared first, so a flag raised by a handler while this update is being sent isn't lost.
+            self.flagged_for_update = False
 
-            GridManager.send_surrounding(PacketWriter.get_packet(
-                OpCode.SMSG_UPDATE_OBJECT,
-                self.get_update_packet(update_type=UpdateTypes.UPDATE_FULL, is_self=False)),
-                self, include_self=False)
+            # Only the changed fields, the same block goes to the player and to everyone that can see it.
+            update_block = self.get_update_packet(update_type=UpdateTypes.UPDATE_PARTIAL)
+            if update_block:
+                GridManager.send_surrounding_update(update_block, self, include_self=True)
 
             GridManager.update_object(self)
 
-            self.flagged_for_update = False
+        if self.flagged_for_visibility_update:
+            self.flagged_for_visibility_update = False
+            InterestManager.update_visibility(self)
 
     # override
     def get_type(self):
@@ -8,6 +8,7 @@ from network.packet.PacketWriter import *
 from network.packet.PacketReader import *
 from utils.ConfigManager import config
 from utils.constants.AuthCodes import *
+from database.DatabaseExecutor import DatabaseExecutor
 from database.realm.RealmDatabaseManager import *
 from game.realm.AccountManager import AccountManager
 
@@ -22,25 +23,39 @@ class AuthSessionHandler(object):
         username, password = PacketReader.read_string(reader.data, 8).strip().split()
         password = hashlib.sha256(password.encode('utf-8')).hexdigest()
 
+        DatabaseExecutor.submit(world_session, AuthSessionHandler.login, username, password,
+                                world_session.client_address[0],
+                                callback=lambda res: AuthSessionHandler.complete_auth(world_session, version, *res))
+
+        return 0
+
+    # Runs on a database worker.
+    @staticmethod
+    def login(username, password, ip):
+        login_res, account_mgr = RealmDatabaseManager.account_try_login(username, password)
+        if login_res == -1 and config.Server.Settings.auto_create_accounts:
+            account_mgr = RealmDatabaseManager.account_create(username, password, ip)
+        return login_res, account_mgr
+
+    @staticmethod
+    def complete_auth(world_session, version, login_res, account_mgr):
         auth_code = AuthCode.AUTH_OK
 
         if version != config.Server.Settings.supported_client:
             auth_code = AuthCode.AUTH_VERSION_MISMATCH
 
-        login_res, world_session.account_mgr = RealmDatabaseManager.account_try_login(username, password)
+        world_session.account_mgr = account_mgr
         if login_res == 0:
             auth_code = AuthCode.AUTH_INCORRECT_PASSWORD
-        elif login_res == -1:
-            if config.Server.Settings.auto_create_accounts:
-                world_session.account_mgr = RealmDatabaseManager.account_create(username, password,
-                                                                                socket.getpeername()[0])
-            else:
-                auth_code = AuthCode.AUTH_UNKNOWN_ACCOUNT
+        elif login_res == -1 and not config.Server.Settings.auto_create_accounts:
+            auth_code = AuthCode.AUTH_UNKNOWN_ACCOUNT
 
-        WorldSessionStateHandler.disonnect_old_session(world_session)
-        WorldSessionStateHandler.add(world_session)
+        if auth_code == AuthCode.AUTH_OK:
+            WorldSessionStateHandler.disonnect_old_session(world_session)
+            WorldSessionStateHandler.add(world_session)
 
         data = pack('<B', auth_code)
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_AUTH_RESPONSE, data))
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_AUTH_RESPONSE, data))
 
-        return 0 if auth_code == AuthCode.AUTH_OK else -1
+        if auth_code != AuthCode.AUTH_OK:
+            world_session.request_disconnect()
@@ -0,0 +1,33 @@
+from game.world.managers.ChannelManager import ChannelManager
+from network.packet.PacketReader import *
+
+
+class ChannelHandler(object):
+
+    @staticmethod
+    def handle_join(world_session, socket, reader):
+        if len(reader.data) > 1:  # Avoid handling empty join channel packet
+            channel_name = PacketReader.read_string(reader.data, 0).strip()
+            # The password starts right after the name's terminator, whatever the name looked like.
+            name_end = bytes(reader.data).find(b'\x00')
+            password = PacketReader.read_string(reader.data, name_end + 1) if name_end >= 0 else ''
+            if channel_name:
+                ChannelManager.join(world_session.player_mgr, channel_name, password)
+
+        return 0
+
+    @staticmethod
+    def handle_leave(world_session, socket, reader):
+        if len(reader.data) > 1:  # Avoid handling empty leave channel packet
+            channel_name = PacketReader.read_string(reader.data, 0).strip()
+            ChannelManager.leave(world_session.player_mgr, channel_name)
+
+        return 0
+
+    @staticmethod
+    def handle_list(world_session, socket, reader):
+        if len(reader.data) > 1:  # Avoid handling empty channel list packet
+            channel_name = PacketReader.read_string(reader.data, 0).strip()
+            ChannelManager.send_list(world_session.player_mgr, channel_name)
+
+        return 0
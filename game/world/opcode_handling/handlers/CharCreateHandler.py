@@ -1,5 +1,6 @@
 from struct import pack, unpack
 
+from database.DatabaseExecutor import DatabaseExecutor
 from database.dbc.DbcDatabaseManager import DbcDatabaseManager
 from game.world.managers.objects.item.ItemManager import ItemManager
 from network.packet.PacketWriter import *
@@ -22,13 +23,23 @@ class CharCreateHandler(object):
             '<BBBBBBBBB', reader.data[len(name)+1:]
         )
 
+        DatabaseExecutor.submit(world_session, CharCreateHandler.create_character,
+                                world_session.account_mgr.account.id, name, race, class_, gender, skin, face,
+                                hairstyle, haircolor, facialhair,
+                                callback=lambda result: CharCreateHandler.send_result(world_session, result))
+
+        return 0
+
+    # Runs on a database worker.
+    @staticmethod
+    def create_character(account_id, name, race, class_, gender, skin, face, hairstyle, haircolor, facialhair):
         result = CharCreate.CHAR_CREATE_SUCCESS
         if RealmDatabaseManager.character_does_name_exist(name):
             result = CharCreate.CHAR_CREATE_NAME_IN_USE
 
         if result == CharCreate.CHAR_CREATE_SUCCESS:
             map_, zone, x, y, z, o = CharCreateHandler.get_starting_location(race, class_)
-            character = Character(account_id=world_session.account_mgr.account.id,
+            character = Character(account_id=account_id,
                                   name=name,
                                   race=race,
                                   class_=class_,
@@ -48,10 +59,12 @@ class CharCreateHandler(object):
             RealmDatabaseManager.character_create(character)
             CharCreateHandler.generate_starting_items(character.guid, race, class_, gender)
 
-        data = pack('<B', result)
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_CHAR_CREATE, data))
+        return result
 
-        return 0
+    @staticmethod
+    def send_result(world_session, result):
+        data = pack('<B', result)
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_CHAR_CREATE, data))
 
     @staticmethod
     def get_starting_location(race, class_):
@@ -1,7 +1,9 @@
 from struct import pack, unpack
 
+from database.DatabaseExecutor import DatabaseExecutor
 from network.packet.PacketWriter import *
 from database.realm.RealmDatabaseManager import *
+from game.world.opcode_handling.handlers.NameQueryHandler import NameQueryHandler
 from utils.Logger import Logger
 from utils.constants.CharCodes import *
 
@@ -14,11 +16,21 @@ class CharDeleteHandler(object):
         if len(reader.data) >= 8:  # Avoid handling empty area char delete packet
             guid = unpack('<Q', reader.data[:8])[0]
 
+        if guid == 0:
+            CharDeleteHandler.send_result(world_session, guid, -1)
+        else:
+            DatabaseExecutor.submit(world_session, RealmDatabaseManager.character_delete, guid,
+                                    callback=lambda result: CharDeleteHandler.send_result(world_session, guid, result))
+
+        return 0
+
+    @staticmethod
+    def send_result(world_session, guid, result):
         res = CharDelete.CHAR_DELETE_SUCCESS
-        if guid == 0 or RealmDatabaseManager.character_delete(guid) != 0:
+        if result != 0:
             res = CharDelete.CHAR_DELETE_FAILED
             Logger.error('Error deleting character with guid %s.' % guid)
+        else:
+            NameQueryHandler.invalidate(guid)
 
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_CHAR_DELETE, pack('<B', res)))
-
-        return 0
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_CHAR_DELETE, pack('<B', res)))
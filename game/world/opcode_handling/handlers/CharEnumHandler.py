@@ -1,27 +1,45 @@
 import time
 from struct import pack, unpack
 
+from database.DatabaseExecutor import DatabaseExecutor
 from database.world.WorldDatabaseManager import WorldDatabaseManager
+from game.world.managers.PersistenceManager import PersistenceManager
 from network.packet.PacketWriter import *
 from database.realm.RealmDatabaseManager import *
+from utils.constants.ItemCodes import InventorySlots
 
 
 class CharEnumHandler(object):
 
     @staticmethod
     def handle(world_session, socket, reader):
-        characters = RealmDatabaseManager.account_get_characters(world_session.account_mgr.account.id)
-        count = len(characters)
-
-        data = pack('<B', count)
-        for character in characters:
-            data += CharEnumHandler.get_char_packet(world_session, character)
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_CHAR_ENUM, data))
+        DatabaseExecutor.submit(world_session, CharEnumHandler.load_characters, world_session.account_mgr.account.id,
+                                callback=lambda result: CharEnumHandler.send_characters(world_session, *result))
 
         return 0
 
+    # Runs on a database worker, item templates too since a cache miss reads the world database.
+    @staticmethod
+    def load_characters(account_id):
+        characters = RealmDatabaseManager.account_get_characters(account_id)
+        # Characters that just logged out (relog) are read again once their last save is written.
+        if any([PersistenceManager.wait_for_save(character.guid) for character in characters]):
+            characters = RealmDatabaseManager.account_get_characters(account_id)
+        equipment = RealmDatabaseManager.account_get_equipment(account_id)
+        item_templates = WorldDatabaseManager.item_template_get_by_entries(
+            [entry for character_equipment in equipment.values() for entry in character_equipment.values()])
+        return characters, equipment, item_templates
+
+    @staticmethod
+    def send_characters(world_session, characters, equipment, item_templates):
+        data = pack('<B', len(characters))
+        for character in characters:
+            data += CharEnumHandler.get_char_packet(world_session, character, equipment.get(character.guid, {}),
+                                                    item_templates)
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_CHAR_ENUM, data))
+
     @staticmethod
-    def get_char_packet(world_session, character):
+    def get_char_packet(world_session, character, equipment, item_templates):
         name_bytes = PacketWriter.string_to_bytes(character.name)
         char_fmt = '<Q%usBBBBBBBBBIIfffIIII' % len(name_bytes)
         char_packet = pack(
@@ -48,15 +66,16 @@ class CharEnumHandler(object):
             0  # TODO: Handle PetFamily
         )
 
-        for slot in range(0, 19):
-            item = RealmDatabaseManager.character_get_item_by_slot(character.guid, slot)
+        # item_templates is {entry: template}, item_template lives in another database.
+        for slot in range(0, InventorySlots.SLOT_BAG1):
             display_id = 0
             inventory_type = 0
 
-            if item:
-                item_template = WorldDatabaseManager.item_template_get_by_entry(item.item_template)
-                display_id = item_template.display_id
-                inventory_type = item_template.inventory_type
+            if slot in equipment:
+                item_template = item_templates.get(equipment[slot])
+                if item_template:
+                    display_id = item_template.display_id
+                    inventory_type = item_template.inventory_type
             char_packet += pack('<IB', display_id, inventory_type)
 
         char_packet += pack('<IB', 0, 0)  # First bag data
@@ -3,6 +3,7 @@ from game.world.managers.GridManager import GridManager
 from network.packet.PacketReader import *
 from struct import pack, unpack, error
 from game.world.managers.ChatManager import ChatManager
+from game.world.managers.ChannelManager import ChannelManager
 from utils.constants.ObjectCodes import ChatMsgs, ChatFlags
 from utils.ConfigManager import config
 from game.world.managers.CommandManager import CommandManager
@@ -38,6 +39,13 @@ class ChatHandler(object):
             if not ChatHandler.check_if_command(world_session, message):
                 ChatManager.send_whisper(world_session.player_mgr, target_player_mgr, message, 0)  # TODO: handle lang
             return 0
+        # Channel
+        elif chat_type == ChatMsgs.CHAT_MSG_CHANNEL:
+            channel_name = PacketReader.read_string(reader.data, 8).strip()
+            message = PacketReader.read_string(reader.data, 8 + len(channel_name) + 1)
+            if not ChatHandler.check_if_command(world_session, message):
+                ChannelManager.send_message(world_session.player_mgr, channel_name, message, lang)
+            return 0
 
         if not ChatHandler.check_if_command(world_session, message):
             ChatManager.send_chat_message(world_session, guid, chat_flags, message, chat_type, lang,
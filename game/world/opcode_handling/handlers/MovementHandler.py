@@ -40,6 +40,7 @@ class MovementHandler(object):
                 GridManager.send_surrounding(PacketWriter.get_packet(OpCode(reader.opcode), movement_data),
                                              world_session.player_mgr, include_self=False)
                 GridManager.update_object(world_session.player_mgr)
+                world_session.player_mgr.update_surrounding()
                 world_session.player_mgr.sync_player()
 
                 if reader.opcode == OpCode.MSG_MOVE_JUMP and \
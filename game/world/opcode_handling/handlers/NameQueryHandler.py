@@ -1,10 +1,17 @@
+import threading
 from struct import pack, unpack
 
+from database.DatabaseExecutor import DatabaseExecutor
 from database.realm.RealmDatabaseManager import RealmDatabaseManager
 from game.world.managers.GridManager import GridManager
 from network.packet.PacketWriter import PacketWriter
 from utils.constants.OpCodes import OpCode
 
+# character guid -> SMSG_NAME_QUERY_RESPONSE. Name, race, gender and class never change, so every response is built
+# once and the same packet is sent to everyone asking.
+NAME_QUERY_CACHE = dict()
+NAME_QUERY_CACHE_LOCK = threading.Lock()
+
 
 class NameQueryHandler(object):
 
@@ -12,20 +19,33 @@ class NameQueryHandler(object):
     def handle(world_session, socket, reader):
         if len(reader.data) >= 8:  # Avoid handling empty name query packet
             guid = unpack('<Q', reader.data[:8])[0]
+            name_packet = NAME_QUERY_CACHE.get(guid)
+            if name_packet:
+                world_session.enqueue_packet(name_packet)
+                return 0
+
             player_mgr = GridManager.get_surrounding_player_by_guid(world_session.player_mgr, guid)
 
             if player_mgr:
-                player = player_mgr.player
+                NameQueryHandler.send_query_details(world_session, player_mgr.player)
             else:
-                player = RealmDatabaseManager.character_get_by_guid(guid)
-
-            if player:
-                socket.sendall(NameQueryHandler.get_query_details(player))
+                DatabaseExecutor.submit(world_session, RealmDatabaseManager.character_get_by_guid, guid,
+                                        callback=lambda player: NameQueryHandler.send_query_details(world_session,
+                                                                                                    player))
 
         return 0
 
+    @staticmethod
+    def send_query_details(world_session, player):
+        if player:
+            world_session.enqueue_packet(NameQueryHandler.get_query_details(player))
+
     @staticmethod
     def get_query_details(player):
+        name_packet = NAME_QUERY_CACHE.get(player.guid)
+        if name_packet:
+            return name_packet
+
         name_bytes = PacketWriter.string_to_bytes(player.name)
         player_data = pack(
             '<Q%usIII' % len(name_bytes),
@@ -35,4 +55,13 @@ class NameQueryHandler(object):
             player.gender,
             player.class_
         )
-        return PacketWriter.get_packet(OpCode.SMSG_NAME_QUERY_RESPONSE, player_data)
+        name_packet = PacketWriter.get_packet(OpCode.SMSG_NAME_QUERY_RESPONSE, player_data)
+        with NAME_QUERY_CACHE_LOCK:
+            NAME_QUERY_CACHE[player.guid] = name_packet
+        return name_packet
+
+    # Must be called whenever a character is deleted.
+    @staticmethod
+    def invalidate(guid):
+        with NAME_QUERY_CACHE_LOCK:
+            NAME_QUERY_CACHE.pop(guid, None)
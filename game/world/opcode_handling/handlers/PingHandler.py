@@ -10,6 +10,6 @@ class PingHandler(object):
         if len(reader.data) >= 4:  # Avoid handling empty ping packet
             ping_data = unpack('<I', reader.data[:4])[0]
             data = pack('<L', ping_data)
-            socket.sendall(PacketWriter.get_packet(OpCode.SMSG_PONG, data))
+            world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_PONG, data))
 
         return 0
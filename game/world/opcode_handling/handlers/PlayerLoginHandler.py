@@ -2,7 +2,10 @@ import time
 
 from struct import unpack
 
+from database.DatabaseExecutor import DatabaseExecutor
+from database.world.WorldDatabaseManager import WorldDatabaseManager
 from game.world.WorldSessionStateHandler import WorldSessionStateHandler
+from game.world.managers.PersistenceManager import PersistenceManager
 from network.packet.PacketWriter import *
 from database.realm.RealmDatabaseManager import *
 from database.dbc.DbcDatabaseManager import *
@@ -22,48 +25,73 @@ class PlayerLoginHandler(object):
 
         guid = unpack('<Q', reader.data[:8])[0]
 
-        world_session.player_mgr = PlayerManager(
-            RealmDatabaseManager.character_get_by_guid(guid), world_session)
-        world_session.player_mgr.session = world_session
-        if not world_session.player_mgr.player:
+        DatabaseExecutor.submit(world_session, PlayerLoginHandler.load_character, guid,
+                                callback=lambda res: PlayerLoginHandler.complete_login(world_session, guid, *res))
+
+        return 0
+
+    # Everything the login needs from the database, read on a database worker. Item templates too, a cache miss
+    # would otherwise read the world database on the world tick.
+    @staticmethod
+    def load_character(guid):
+        PersistenceManager.wait_for_save(guid)
+        character = RealmDatabaseManager.character_get_by_guid(guid)
+        if not character:
+            return None, None, None, None, None
+
+        character_inventory = RealmDatabaseManager.character_get_inventory(guid)
+        return character, \
+            character_inventory, \
+            WorldDatabaseManager.item_template_get_by_entries(
+                [item_instance.item_template for item_instance in character_inventory]), \
+            WorldDatabaseManager.player_create_skill_get(character.race, character.class_), \
+            WorldDatabaseManager.player_create_spell_get(character.race, character.class_)
+
+    @staticmethod
+    def complete_login(world_session, guid, character, character_inventory, item_templates, create_skills,
+                       create_spells):
+        if world_session.player_mgr:
+            return
+
+        if not character:
             Logger.anticheat('Character with wrong guid (%u) tried to login.' % guid)
-            return -1
+            world_session.request_disconnect()
+            return
+
+        world_session.player_mgr = PlayerManager(character, world_session)
+        world_session.player_mgr.session = world_session
 
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_LOGIN_SETTIMESPEED,
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_LOGIN_SETTIMESPEED,
                                                PlayerLoginHandler._get_login_timespeed()))
 
-        world_session.player_mgr.load_skills()
-        world_session.player_mgr.load_spells()
+        world_session.player_mgr.load_skills(create_skills)
+        world_session.player_mgr.load_spells(create_spells)
 
-        socket.sendall(world_session.player_mgr.get_tutorial_packet())
-        socket.sendall(world_session.player_mgr.get_initial_spells())
-        socket.sendall(world_session.player_mgr.get_action_buttons())
+        world_session.enqueue_packet(world_session.player_mgr.get_tutorial_packet())
+        world_session.enqueue_packet(world_session.player_mgr.get_initial_spells())
+        world_session.enqueue_packet(world_session.player_mgr.get_action_buttons())
 
         # MotD
         ChatManager.send_system_message(world_session, config.Server.General.motd)
 
         # Clear Who list on login, otherwise the last search will appear
-        PlayerLoginHandler._clear_who_list(socket)
+        PlayerLoginHandler._clear_who_list(world_session)
 
-        world_session.player_mgr.inventory.load_items()
+        world_session.player_mgr.inventory.load_items(character_inventory, item_templates)
 
-        update_packet = UpdatePacketFactory.compress_if_needed(PacketWriter.get_packet(
-            OpCode.SMSG_UPDATE_OBJECT,
-            world_session.player_mgr.get_update_packet(update_type=UpdateTypes.UPDATE_FULL)))
-        socket.sendall(update_packet)
+        world_session.enqueue_update_block(
+            world_session.player_mgr.get_update_packet(update_type=UpdateTypes.UPDATE_FULL))
 
-        PlayerLoginHandler._send_cinematic(world_session, world_session.player_mgr.player, socket)
+        PlayerLoginHandler._send_cinematic(world_session, world_session.player_mgr.player)
         world_session.player_mgr.complete_login()
 
-        return 0
-
     @staticmethod
-    def _clear_who_list(socket):
+    def _clear_who_list(world_session):
         data = pack('<2I', 0, 0)
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_WHO, data))
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_WHO, data))
 
     @staticmethod
-    def _send_cinematic(world_session, player, socket):
+    def _send_cinematic(world_session, player):
         if player.totaltime == 0:
             # Sadly, ONLY undeads have intro cinematic.
             cinematic_id = DbcDatabaseManager.chr_races_get_by_race(player.race).CinematicSequenceID
@@ -71,7 +99,7 @@ class PlayerLoginHandler(object):
                 data = pack(
                     '<I', cinematic_id
                 )
-                socket.sendall(PacketWriter.get_packet(OpCode.SMSG_TRIGGER_CINEMATIC, data))
+                world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_TRIGGER_CINEMATIC, data))
 
     @staticmethod
     def _get_login_timespeed():
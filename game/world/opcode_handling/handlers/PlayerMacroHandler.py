@@ -26,6 +26,6 @@ class PlayerMacroHandler(object):
             11: Raspberr...
             """
 
-            socket.sendall(PacketWriter.get_packet(OpCode.SMSG_PLAYER_MACRO, pack('<I', reader.data)))
+            world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_PLAYER_MACRO, pack('<I', reader.data)))
 
         return 0
@@ -10,6 +10,6 @@ class TimeQueryHandler(object):
     def handle(world_session, socket, reader):
         seconds = int(time.time())
         data = pack('<I', seconds)
-        socket.sendall(PacketWriter.get_packet(OpCode.SMSG_QUERY_TIME_RESPONSE, data))
+        world_session.enqueue_packet(PacketWriter.get_packet(OpCode.SMSG_QUERY_TIME_RESPONSE, data))
 
         return 0
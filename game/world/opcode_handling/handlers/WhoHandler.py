@@ -1,8 +1,6 @@
 from struct import pack, unpack
 
-from database.world.WorldDatabaseManager import WorldDatabaseManager
-from game.world.WorldSessionStateHandler import WorldSessionStateHandler
-from game.world.managers.GridManager import GridManager
+from game.world.managers.WhoManager import WhoManager
 from network.packet.PacketWriter import *
 from network.packet.PacketReader import *
 
@@ -42,59 +40,51 @@ class WhoHandler(object):
                 user_strings.append(user_string)
                 current_size += len(user_string)
 
-            online_count = 0
+            query = (level_min, level_max, player_name.lower(), guild_name.lower(), race_mask, class_mask,
+                     tuple(sorted(zones)), tuple(sorted(string.lower() for string in user_strings)))
+            who_packet = WhoManager.get_cached_response(query)
+            if who_packet:
+                world_session.enqueue_packet(who_packet)
+                return 0
+
+            population_version = WhoManager.population_version
+            online_count = WhoManager.get_online_count()
             player_count = 0
             player_data = b''
-            for session in WorldSessionStateHandler.get_world_sessions():
-                if session.player_mgr and session.player_mgr.is_online:
-                    online_count += 1
-                    if player_count == 49:
-                        continue
+            for player_mgr in WhoManager.find_players(level_min, level_max, race_mask, class_mask, zones):
+                if player_count == 49:
+                    break
 
-                    if session.player_mgr.level < level_min or session.player_mgr.level > level_max:
-                        continue
-                    if player_name and not player_name.lower() in session.player_mgr.player.name.lower:
-                        continue
-                    if guild_name and guild_name.lower() not in session.player_mgr.guild_manager.guild_name.lower():
-                        continue
-                    if class_mask != 0xFFFFFFFF and class_mask & session.player_mgr.class_mask != session.player_mgr.class_mask:
-                        continue
-                    if race_mask != 0xFFFFFFFF and race_mask & session.player_mgr.race_mask != session.player_mgr.race_mask:
+                if player_name and player_name.lower() not in player_mgr.player.name.lower():
+                    continue
+                if guild_name and guild_name.lower() not in player_mgr.guild_manager.guild_name.lower():
+                    continue
+                if user_strings_count > 0:
+                    skip = True
+                    for string in user_strings:
+                        if string.lower() in player_mgr.player.name.lower():
+                            skip = False
+                            break
+                    if skip:
                         continue
-                    if zone_count > 0:
-                        area = WorldDatabaseManager.area_get_by_id(session.player_mgr.zone)
-                        if area:
-                            skip = True
-                            for zone in zones:
-                                if zone == area.zone_id or area.zone_id == 0 and zone == area.entry:
-                                    skip = False
-                                    break
-                            if skip:
-                                continue
-                    if user_strings_count > 0:
-                        skip = True
-                        for string in user_strings:
-                            if string.lower() in session.player_mgr.player.name.lower():
-                                skip = False
-                                break
-                        if skip:
-                            continue
 
-                    player_name_bytes = PacketWriter.string_to_bytes(session.player_mgr.player.name)
-                    guild_name_bytes = PacketWriter.string_to_bytes(session.player_mgr.guild_manager.guild_name)
-                    player_data += pack(
-                        '<%us%us5I' % (len(player_name_bytes), len(guild_name_bytes)),
-                        player_name_bytes,
-                        guild_name_bytes,
-                        session.player_mgr.level,
-                        session.player_mgr.player.class_,
-                        session.player_mgr.player.race,
-                        session.player_mgr.zone,
-                        session.player_mgr.group_status
-                    )
-                    player_count += 1
+                player_name_bytes = PacketWriter.string_to_bytes(player_mgr.player.name)
+                guild_name_bytes = PacketWriter.string_to_bytes(player_mgr.guild_manager.guild_name)
+                player_data += pack(
+                    '<%us%us5I' % (len(player_name_bytes), len(guild_name_bytes)),
+                    player_name_bytes,
+                    guild_name_bytes,
+                    player_mgr.level,
+                    player_mgr.player.class_,
+                    player_mgr.player.race,
+                    player_mgr.zone,
+                    player_mgr.group_status
+                )
+                player_count += 1
 
             data = pack('<2I', player_count, online_count if online_count > 49 else player_count) + player_data
-            socket.sendall(PacketWriter.get_packet(OpCode.SMSG_WHO, data))
+            who_packet = PacketWriter.get_packet(OpCode.SMSG_WHO, data)
+            WhoManager.cache_response(query, population_version, who_packet)
+            world_session.enqueue_packet(who_packet)
 
         return 0
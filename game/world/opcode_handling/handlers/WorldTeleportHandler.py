@@ -23,5 +23,6 @@ class WorldTeleportHandler(object):
     @staticmethod
     def handle_ack(world_session, socket, reader):
         world_session.player_mgr.flagged_for_update = True
+        world_session.player_mgr.update_surrounding()
 
         return 0
@@ -1,6 +1,8 @@
 from struct import pack, unpack
 
+from game.world.managers.ChannelManager import ChannelManager
 from game.world.managers.GridManager import GridManager
+from game.world.managers.WhoManager import WhoManager
 from network.packet.PacketWriter import *
 
 
@@ -11,5 +13,7 @@ class ZoneUpdateHandler(object):
         if len(reader.data) >= 4:  # Avoid handling empty zone update packet
             zone = unpack('<I', reader.data[:4])[0]
             world_session.player_mgr.zone = zone
+            WhoManager.update_player(world_session.player_mgr)
+            ChannelManager.update_zone(world_session.player_mgr)
 
         return 0
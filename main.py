@@ -26,5 +26,8 @@ if __name__ == '__main__':
     proxy_process = Process(target=RealmManager.ProxyServerSessionHandler.start)
     proxy_process.start()
 
-    world_process = Process(target=WorldManager.WorldServerSessionHandler.start)
+    if config.Server.Settings.use_async_world_server:
+        world_process = Process(target=WorldManager.AsyncWorldServerSessionHandler.start)
+    else:
+        world_process = Process(target=WorldManager.WorldServerSessionHandler.start)
     world_process.start()
@@ -0,0 +1,63 @@
+from struct import unpack_from
+
+from network.packet.PacketReader import PacketReader
+
+# Client packet header : Size: 2 bytes (big endian, doesn't count itself) + Cmd: 4 bytes
+CLIENT_HEADER_SIZE = 6
+DEFAULT_CAPACITY = 8192
+MIN_FREE_SPACE = 1024
+
+
+class PacketBuffer(object):
+    # Reusable receive buffer that splits the incoming TCP stream into whole client packets. Incoming bytes are
+    # written in place (recv_into / BufferedProtocol), so nothing is allocated until a complete packet is sliced out.
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.buffer = bytearray(capacity)
+        self.read_pos = 0
+        self.write_pos = 0
+        self.pending_size = 0
+
+    def get_write_buffer(self):
+        if self.read_pos == self.write_pos:
+            self.read_pos = 0
+            self.write_pos = 0
+        elif len(self.buffer) - self.write_pos < max(MIN_FREE_SPACE, self.pending_size - self.available()):
+            self._compact()
+
+        # A single packet bigger than the whole buffer, grow it so it fits.
+        if self.pending_size > len(self.buffer):
+            self.buffer.extend(bytes(self.pending_size - len(self.buffer)))
+
+        return memoryview(self.buffer)[self.write_pos:]
+
+    def commit(self, size):
+        self.write_pos += size
+
+    def available(self):
+        return self.write_pos - self.read_pos
+
+    def read_packets(self):
+        packets = []
+
+        while self.available() >= CLIENT_HEADER_SIZE:
+            packet_size = unpack_from('>H', self.buffer, self.read_pos)[0] + 2
+            if packet_size < CLIENT_HEADER_SIZE:
+                # Malformed header, there is no way to find the next packet boundary.
+                return None
+
+            if self.available() < packet_size:
+                self.pending_size = packet_size
+                break
+
+            packets.append(PacketReader(bytes(memoryview(self.buffer)[self.read_pos:self.read_pos + packet_size])))
+            self.read_pos += packet_size
+            self.pending_size = 0
+
+        return packets
+
+    def _compact(self):
+        remaining = self.available()
+        self.buffer[0:remaining] = self.buffer[self.read_pos:self.write_pos]
+        self.read_pos = 0
+        self.write_pos = remaining
@@ -0,0 +1,99 @@
+import os
+import threading
+import weakref
+from collections import deque
+
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+# Every open queue, flushed together at the end of each world tick.
+QUEUES = weakref.WeakSet()
+QUEUES_LOCK = threading.Lock()
+
+
+class PacketQueue(object):
+    # Outgoing packets of a single session, drained by one writer once per tick. The queue keeps track of how many
+    # bytes are waiting, so a client that can't keep up is detected (put() returns False) instead of buffering
+    # forever.
+
+    def __init__(self, high_water_mark, on_flush=None):
+        self.high_water_mark = high_water_mark
+        self.on_flush = on_flush  # Called at the end of a tick when there is something to send.
+
+        self.packets = deque()
+        self.pending_bytes = 0
+        self.flush_requested = False
+        self.is_closed = False
+        self.condition = threading.Condition()
+
+        with QUEUES_LOCK:
+            QUEUES.add(self)
+
+    def put(self, packet):
+        with self.condition:
+            if self.is_closed:
+                return True
+            if self.pending_bytes + len(packet) > self.high_water_mark:
+                return False
+
+            self.packets.append(packet)
+            self.pending_bytes += len(packet)
+        return True
+
+    # Called by the world tick once it's over, so whatever every session queued during the tick is sent together.
+    @staticmethod
+    def flush_all():
+        with QUEUES_LOCK:
+            queues = list(QUEUES)
+        for queue in queues:
+            queue.flush()
+
+    def flush(self):
+        with self.condition:
+            if not self.packets or self.is_closed:
+                return
+            self.flush_requested = True
+            self.condition.notify()
+
+        if self.on_flush:
+            self.on_flush()
+
+    # Blocks until the tick that queued something is over, or until the queue gets closed.
+    def wait_for_flush(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.flush_requested or self.is_closed)
+
+    def take_all(self):
+        with self.condition:
+            packets = list(self.packets)
+            self.packets.clear()
+            self.pending_bytes = 0
+            self.flush_requested = False
+            return packets
+
+    def close(self):
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+
+        with QUEUES_LOCK:
+            QUEUES.discard(self)
+
+    # Writes every packet with a single scatter / gather call when possible, the packets themselves are not copied.
+    @staticmethod
+    def send_packets(sck, packets):
+        if not hasattr(sck, 'sendmsg'):
+            sck.sendall(b''.join(packets))
+            return
+
+        buffers = [memoryview(packet) for packet in packets]
+        index = 0
+        while index < len(buffers):
+            sent = sck.sendmsg(buffers[index:index + IOV_MAX])
+            # Skip what went through, a partially sent packet is resumed from where it stopped.
+            while sent > 0:
+                buffer_length = len(buffers[index])
+                if sent >= buffer_length:
+                    sent -= buffer_length
+                    index += 1
+                else:
+                    buffers[index] = buffers[index][sent:]
+                    sent = 0
@@ -6,11 +6,10 @@ from utils.constants.OpCodes import *
 class PacketReader(object):
     def __init__(self, data):
         if len(data) > 5:
-            size, opcode = unpack(
-                '<HI', data[0:6]
-            )
+            size = unpack('>H', data[0:2])[0]
+            opcode = unpack('<I', data[2:6])[0]
 
-            self.size = (size / 0x100) - 4
+            self.size = size - 4
             self.opcode = opcode
             self.data = data[6:]
         else:
@@ -1,4 +1,4 @@
-from struct import pack, unpack
+from struct import pack, Struct
 from bitarray import bitarray
 
 from utils.constants.OpCodes import OpCode
@@ -6,106 +6,143 @@ from utils.constants.UpdateFields import *
 from utils.constants.ObjectCodes import *
 from network.packet.PacketWriter import PacketWriter
 
+# Every update field is 4 bytes long, 64 bit values take two fields.
+FIELD_SIZE = 4
+FIELD_STRUCTS = {value_type: Struct('<%s' % value_type) for value_type in ('I', 'i', 'f')}
+# Searched for to find the updated fields.
+UPDATED_BIT = bitarray('1', endian='little')
+
 
 class UpdatePacketFactory(object):
     def __init__(self, types_list=()):
         self.types_list = types_list
 
-        self.object_values = []
-        self.updated_object_fields = bitarray(ObjectFields.OBJECT_END)
-
-        self.item_values = []
-        self.updated_item_fields = bitarray(ItemFields.ITEM_END)
-
-        self.container_values = []
-        self.updated_container_fields = bitarray(ContainerFields.CONTAINER_END)
-
-        self.unit_values = []
-        self.updated_unit_fields = bitarray(UnitFields.UNIT_END)
-
-        self.player_values = []
-        self.updated_player_fields = bitarray(PlayerFields.PLAYER_END)
-
-        self.gameobject_values = []
-        self.updated_gameobject_fields = bitarray(GameObjectFields.GAMEOBJECT_END)
-
-        self.dynamic_object_values = []
-        self.updated_dynamic_object_fields = bitarray(DynamicObjectFields.DYNAMICOBJECT_END)
-
-        self.init_lists()
-
-        self.update_packet = b''
-
-    def update(self, values_list, updated_fields_list, pos, value, value_type):
-        if value_type.lower() == 'q':
-            self.update(values_list, updated_fields_list, pos, int(value & 0xFFFFFFFF), 'I')
-            self.update(values_list, updated_fields_list, pos + 1, int(value >> 32), 'I')
-        else:
-            values_list[pos] = pack('<%s' % value_type, value)
-            updated_fields_list[pos] = 1
-
-    def init_lists(self):
-        self.object_values = [pack('<I', 0)] * ObjectFields.OBJECT_END
-        self.updated_object_fields.setall(0)
-
-        self.item_values = [pack('<I', 0)] * ItemFields.ITEM_END
-        self.updated_item_fields.setall(0)
-
-        self.container_values = [pack('<I', 0)] * ContainerFields.CONTAINER_END
-        self.updated_container_fields.setall(0)
-
-        self.unit_values = [pack('<I', 0)] * UnitFields.UNIT_END
-        self.updated_unit_fields.setall(0)
-
-        self.player_values = [pack('<I', 0)] * PlayerFields.PLAYER_END
-        self.updated_player_fields.setall(0)
-
-        self.gameobject_values = [pack('<I', 0)] * GameObjectFields.GAMEOBJECT_END
-        self.updated_gameobject_fields.setall(0)
-
-        self.dynamic_object_values = [pack('<I', 0)] * DynamicObjectFields.DYNAMICOBJECT_END
-        self.updated_player_fields.setall(0)
-
-    def get_updated_fields_mask(self):
-        updated_fields_mask = b''
-
+        # Values of every type this object has live in this single buffer, laid out the way they are sent, so
+        # building a create block is just a copy of it. The *_values attributes are views into it.
+        values_size = 0
         if ObjectTypes.TYPE_OBJECT in self.types_list:
-            updated_fields_mask += self.updated_object_fields.tobytes()
+            values_size += ObjectFields.OBJECT_END
         if ObjectTypes.TYPE_UNIT in self.types_list:
-            updated_fields_mask += self.updated_unit_fields.tobytes()
+            values_size += UnitFields.UNIT_END
         if ObjectTypes.TYPE_PLAYER in self.types_list:
-            updated_fields_mask += self.updated_player_fields.tobytes()
+            values_size += PlayerFields.PLAYER_END
         if ObjectTypes.TYPE_ITEM in self.types_list:
-            updated_fields_mask += self.updated_item_fields.tobytes()
+            values_size += ItemFields.ITEM_END
         if ObjectTypes.TYPE_CONTAINER in self.types_list:
-            updated_fields_mask += self.updated_container_fields.tobytes()
+            values_size += ContainerFields.CONTAINER_END
         if ObjectTypes.TYPE_GAMEOBJECT in self.types_list:
-            updated_fields_mask += self.updated_gameobject_fields.tobytes()
+            values_size += GameObjectFields.GAMEOBJECT_END
         if ObjectTypes.TYPE_DYNAMICOBJECT in self.types_list:
-            updated_fields_mask += self.updated_dynamic_object_fields.tobytes()
+            values_size += DynamicObjectFields.DYNAMICOBJECT_END
+
+        self.values = bytearray(values_size * FIELD_SIZE)
+        self.values_offset = 0
+
+        # Same order as the values are sent.
+        self.object_values, self.updated_object_fields = \
+            self.init_fields(ObjectTypes.TYPE_OBJECT, ObjectFields.OBJECT_END)
+        self.unit_values, self.updated_unit_fields = \
+            self.init_fields(ObjectTypes.TYPE_UNIT, UnitFields.UNIT_END)
+        self.player_values, self.updated_player_fields = \
+            self.init_fields(ObjectTypes.TYPE_PLAYER, PlayerFields.PLAYER_END)
+        self.item_values, self.updated_item_fields = \
+            self.init_fields(ObjectTypes.TYPE_ITEM, ItemFields.ITEM_END)
+        self.container_values, self.updated_container_fields = \
+            self.init_fields(ObjectTypes.TYPE_CONTAINER, ContainerFields.CONTAINER_END)
+        self.gameobject_values, self.updated_gameobject_fields = \
+            self.init_fields(ObjectTypes.TYPE_GAMEOBJECT, GameObjectFields.GAMEOBJECT_END)
+        self.dynamic_object_values, self.updated_dynamic_object_fields = \
+            self.init_fields(ObjectTypes.TYPE_DYNAMICOBJECT, DynamicObjectFields.DYNAMICOBJECT_END)
+
+    def init_fields(self, object_type, fields_count):
+        size = fields_count * FIELD_SIZE
+        if object_type in self.types_list:
+            values = memoryview(self.values)[self.values_offset:self.values_offset + size]
+            self.values_offset += size
+        else:
+            # Not part of this object, never sent.
+            values = memoryview(bytearray(size))
 
-        return updated_fields_mask
+        updated_fields = bitarray(fields_count, endian='little')
+        updated_fields.setall(0)
 
-    def build_packet(self):
-        self.update_packet = b''
+        return values, updated_fields
+
+    def update(self, values, updated_fields, pos, value, value_type):
+        if value_type.lower() == 'q':
+            self.update(values, updated_fields, pos, int(value & 0xFFFFFFFF), 'I')
+            self.update(values, updated_fields, pos + 1, int(value >> 32), 'I')
+        else:
+            offset = pos * FIELD_SIZE
+            value = FIELD_STRUCTS[value_type].pack(value)
+            # Values are kept between updates, so only the fields that actually changed are flagged.
+            if values[offset:offset + FIELD_SIZE] != value:
+                values[offset:offset + FIELD_SIZE] = value
+                updated_fields[pos] = 1
+
+    # Values and updated fields of every type this object has, in the order the client expects them.
+    def get_fields(self):
+        fields = []
 
         if ObjectTypes.TYPE_OBJECT in self.types_list:
-            self.update_packet += b''.join(self.object_values)
+            fields.append((self.object_values, self.updated_object_fields))
         if ObjectTypes.TYPE_UNIT in self.types_list:
-            self.update_packet += b''.join(self.unit_values)
+            fields.append((self.unit_values, self.updated_unit_fields))
         if ObjectTypes.TYPE_PLAYER in self.types_list:
-            self.update_packet += b''.join(self.player_values)
+            fields.append((self.player_values, self.updated_player_fields))
         if ObjectTypes.TYPE_ITEM in self.types_list:
-            self.update_packet += b''.join(self.item_values)
+            fields.append((self.item_values, self.updated_item_fields))
         if ObjectTypes.TYPE_CONTAINER in self.types_list:
-            self.update_packet += b''.join(self.container_values)
+            fields.append((self.container_values, self.updated_container_fields))
         if ObjectTypes.TYPE_GAMEOBJECT in self.types_list:
-            self.update_packet += b''.join(self.gameobject_values)
+            fields.append((self.gameobject_values, self.updated_gameobject_fields))
         if ObjectTypes.TYPE_DYNAMICOBJECT in self.types_list:
-            self.update_packet += b''.join(self.dynamic_object_values)
+            fields.append((self.dynamic_object_values, self.updated_dynamic_object_fields))
+
+        return fields
+
+    def has_updated_fields(self):
+        for values, updated_fields in self.get_fields():
+            if updated_fields.any():
+                return True
+        return False
 
-        self.init_lists()
-        return self.update_packet
+    def reset_updated_fields(self):
+        for values, updated_fields in self.get_fields():
+            updated_fields.setall(0)
+
+    # One bit per field of the whole object, sent as little endian uint32 blocks.
+    def get_updated_fields_mask(self):
+        updated_fields_mask = bitarray(endian='little')
+        for values, updated_fields in self.get_fields():
+            updated_fields_mask += updated_fields
+
+        updated_fields_mask.extend([0] * (-len(updated_fields_mask) % 32))
+
+        return updated_fields_mask.tobytes()
+
+    # Values of the updated fields only, those are then considered sent. Only the set bits are visited.
+    def build_partial_packet(self):
+        update_packet = []
+        for values, updated_fields in self.get_fields():
+            if not updated_fields.any():
+                continue
+            for pos in updated_fields.search(UPDATED_BIT):
+                update_packet.append(values[pos * FIELD_SIZE:(pos + 1) * FIELD_SIZE])
+            updated_fields.setall(0)
+
+        return b''.join(update_packet)
+
+    # Values of every field, used for create blocks. Updated fields are kept, since whoever already knows this
+    # object still has to receive them in a partial update.
+    def build_packet(self):
+        return bytes(self.values)
+
+    # A single SMSG_UPDATE_OBJECT carrying every given update block (one transaction each).
+    @staticmethod
+    def get_update_object_packet(update_blocks):
+        return UpdatePacketFactory.compress_if_needed(PacketWriter.get_packet(
+            OpCode.SMSG_UPDATE_OBJECT, pack('<I', len(update_blocks)) + b''.join(update_blocks)))
 
     @staticmethod
     def compress_if_needed(update_packet):
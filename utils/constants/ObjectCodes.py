@@ -532,6 +532,15 @@ class ChatFlags(IntEnum):
     CHAT_TAG_GM = 3
 
 
+class ChannelNotifications(IntEnum):
+    JOINED = 0x00
+    LEFT = 0x01
+    YOU_JOINED = 0x02
+    YOU_LEFT = 0x03
+    WRONG_PASSWORD = 0x04
+    NOT_MEMBER = 0x05
+
+
 class MoveFlags(IntEnum):
     MOVEFLAG_FORWARD = 0x1
     MOVEFLAG_BACKWARD = 0x2